@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+"""
+Replace files atomically: write a temporary file next to the target and os.replace it
+over the target, so readers (OBS included) never see a half-written file.
+
+Temporary names include the process ID and the thread, so concurrent writers of the
+same file (batch workers, render processes) never share one; the last replace wins.
+"""
+
+import contextlib
+import json
+import os
+import threading
+
+def temp_filename(filename, suffix=".tmp"):
+    """A temporary name next to filename that no other process or thread is using."""
+    return f"{filename}.{os.getpid()}.{threading.get_ident()}{suffix}"
+
+def _discard(temp):
+    try:
+        os.unlink(temp)
+    except OSError:
+        pass
+
+@contextlib.contextmanager
+def replacing(filename, suffix=".tmp"):
+    """
+    Yield a temporary filename for the block to create; when the block completes it
+    replaces filename. If the block raises, the temporary file is removed and filename
+    is left as it was.
+    """
+    temp = temp_filename(filename, suffix)
+    try:
+        yield temp
+        os.replace(temp, filename)
+    finally:
+        # Gone after a successful replace, unless temp and filename were already the
+        # same file (hardlinks), in which case os.replace leaves both names in place
+        _discard(temp)
+
+@contextlib.contextmanager
+def open_replacing(filename, mode="w", encoding="utf-8", fsync=False, **kwargs):
+    """open() a temporary file that replaces filename when the block completes."""
+    temp = temp_filename(filename)
+    file = open(temp, mode, encoding=None if "b" in mode else encoding, **kwargs) # pylint: disable=consider-using-with
+    try:
+        yield file
+        if fsync:
+            file.flush()
+            os.fsync(file.fileno())
+        file.close()
+        os.replace(temp, filename)
+    finally:
+        file.close()
+        _discard(temp)
+
+def write_json(data, filename, **kwargs):
+    """json.dump data to filename atomically, creating its directory if needed."""
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+    with open_replacing(filename) as file:
+        json.dump(data, file, **kwargs)
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+"""
+Measure how scene generation scales with the size of templates.json and the runlist.
+
+For every combination of --sources and --rows, synthesizes a templates.json and a
+runlist and records the best-of-runs time and the tracemalloc peak of:
+    template_load  scenes.load_templates()
+    template_cache scenes.load_template_catalog() from its pickle (template_cache.py),
+                   with the in-memory copy dropped first
+    generate       scenes._generate_scenes() on the loaded templates
+    serialize      scene_writer.write_scene_collection() of the result
+    end_to_end     scenes.generate_scenes(), with the runlist served by a local
+                   fake_google.FakeGoogleServer and the sheet and in-memory template
+                   caches emptied first, so every run parses and indexes the templates
+Results are compared against benchmark-baseline.json (committed next to this file,
+from a --quick run) or the file given with --baseline, and the run fails if any
+measurement regressed beyond --tolerance. Timings depend on the machine; record a
+local baseline with --output before comparing against it.
+
+Examples:
+    benchmark.py --quick
+    benchmark.py --quick --output benchmark-baseline.json --no-baseline
+    benchmark.py --output bench.json --baseline bench.json
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import config
+import fake_google
+import google_sheets as gs
+import scene_writer
+import scenes
+import template_cache
+
+SPREADSHEET_ID = "benchmark-spreadsheet"
+SCENELIST_NAME = "2026-10-18"
+
+BASELINE_FNAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark-baseline.json")
+
+STAGES = ["template_load", "template_cache", "generate", "serialize", "end_to_end"]
+
+# Differences smaller than these are noise, whatever the tolerance
+MIN_TIME_DELTA = 0.002           # seconds
+MIN_MEMORY_DELTA = 64 * 1024     # bytes
+
+def _item(name, source_uuid, rng):
+    return {"name": name, "source_uuid": source_uuid, "visible": True, "locked": False, "rot": 0.0,
+            "pos": {"x": rng.uniform(0, 1920), "y": rng.uniform(0, 1080)}, "scale": {"x": 1.0, "y": 1.0},
+            "align": 5, "bounds_type": 2, "bounds_align": 0, "bounds": {"x": 1920.0, "y": 1080.0},
+            "crop_left": 0, "crop_top": 0, "crop_right": 0, "crop_bottom": 0, "id": 1, "group_item_backup": False,
+            "private_settings": {}}
+
+def _source(source_id, name, settings, rng):
+    return {"prev_ver": 503447554, "name": name, "uuid": f"{rng.getrandbits(128):032x}", "id": source_id,
+            "versioned_id": source_id, "settings": settings, "mixers": 255, "sync": 0, "flags": 0,
+            "volume": 1.0, "balance": 0.5, "enabled": True, "muted": False, "push-to-mute": False,
+            "push-to-talk": False, "hotkeys": {}, "deinterlace_mode": 0, "monitoring_type": 0,
+            "private_settings": {}, "filters": []}
+
+def synthesize_templates(source_count, seed=0):
+    """
+    A templates.json-shaped dict with source_count sources: scene templates (every
+    other one with a browser item), one browser source, and image and text sources
+    that the scene templates show.
+    """
+    rng = random.Random(seed)
+    scene_count = max(2, min(50, source_count // 10))
+    other_count = max(0, source_count - scene_count - 1)
+
+    browser = _source("browser_source", "BrowserSlides", {"url": "about:blank", "width": 1920, "height": 1080,
+                                                          "css": "body { background-color: rgba(0, 0, 0, 0); margin: 0px auto; overflow: hidden; }"}, rng)
+    others = []
+    for index in range(other_count):
+        if index % 2:
+            others.append(_source("text_gdiplus_v2", f"Text {index}", {"text": f"Caption {index} " * 4,
+                                                                       "font": {"face": "Arial", "size": 48}}, rng))
+        else:
+            others.append(_source("image_source", f"Image {index}", {"file": f"C:/Pictures/image-{index}.png"}, rng))
+
+    scene_templates = []
+    for index in range(scene_count):
+        shown = rng.sample(others, min(len(others), 6))
+        items = [_item(source["name"], source["uuid"], rng) for source in shown]
+        if index % 2 == 0:
+            items.insert(len(items) // 2, _item(browser["name"], browser["uuid"], rng))
+        for item_id, item in enumerate(items, 1):
+            item["id"] = item_id
+        scene = _source("scene", f"Template {index}", {"id_counter": len(items), "custom_size": False, "items": items}, rng)
+        scene_templates.append(scene)
+
+    sources = scene_templates + [browser] + others
+    return {"current_scene": scene_templates[0]["name"], "current_program_scene": scene_templates[0]["name"],
+            "scene_order": [{"name": scene["name"]} for scene in scene_templates], "name": "templates",
+            "sources": sources, "groups": [], "quick_transitions": [], "transitions": [],
+            "saved_projectors": [], "current_transition": "Fade", "transition_duration": 300,
+            "preview_locked": False, "scaling_enabled": False, "scaling_level": 0,
+            "scaling_off_x": 0.0, "scaling_off_y": 0.0, "modules": {}, "resolution": {"x": 1920, "y": 1080},
+            "version": 2}
+
+def synthesize_runlist(row_count, templates, seed=0):
+    """A runlist (header row first) of row_count scenes spread over the scene templates."""
+    rng = random.Random(seed)
+    names = [source["name"] for source in templates["sources"] if source["id"] == "scene"]
+    rows = [["Scene", "Template", "Page"]]
+    for index in range(row_count):
+        suffix = "->" if index % 7 == 0 else ""
+        rows.append([f"{index:04d} Scene {index}{suffix}", rng.choice(names), str(index % 120 + 1)])
+    return rows
+
+def best_time(function, runs):
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def peak_memory(function):
+    """Peak bytes allocated while function runs, as tracemalloc sees it."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def _empty_sheet_caches():
+    gs.invalidate_sheet_urls()
+    shutil.rmtree(os.path.join(config.CACHE_DIRECTORY, "sheets"), ignore_errors=True)
+
+def run_case(source_count, row_count, server, runs):
+    templates = synthesize_templates(source_count)
+    runlist = synthesize_runlist(row_count, templates)
+    server.add_spreadsheet(SPREADSHEET_ID, {"Slides": [[SCENELIST_NAME, ""]], SCENELIST_NAME: runlist})
+    url = server.spreadsheet_url(SPREADSHEET_ID)
+
+    templates_filename = f"{config.OBS_SCENES_DIRECTORY}/{config.TEMPLATES_FNAME}"
+    with open(templates_filename, "w", encoding="utf-8") as file:
+        json.dump(templates, file, indent=4)
+    output_filename = os.path.join(config.OBS_SCENES_DIRECTORY, "benchmark-output.json")
+    scenelist_filename = f"{config.OBS_SCENES_DIRECTORY}/{SCENELIST_NAME}.json"
+    pdf_url = f"file:///{config.PDF_SLIDES_DIRECTORY}Slides-{SCENELIST_NAME}.pdf#toolbar=0"
+
+    loaded = scenes.load_templates()
+    collection = scenes._generate_scenes(runlist, loaded, SCENELIST_NAME, pdf_url) # pylint: disable=protected-access
+
+    def cached_template_load():
+        template_cache.invalidate()
+        scenes.load_template_catalog()
+
+    def end_to_end():
+        _empty_sheet_caches()
+        # Measure the template load as a fresh process would pay it
+        template_cache.invalidate()
+        shutil.rmtree(os.path.join(config.CACHE_DIRECTORY, "templates"), ignore_errors=True)
+        # Without an existing file write_scenes doesn't look for a running OBS
+        if os.path.exists(scenelist_filename):
+            os.remove(scenelist_filename)
+        scenes.generate_scenes(url, SCENELIST_NAME)
+
+    functions = {
+        "template_load": scenes.load_templates,
+        "template_cache": cached_template_load,
+        "generate": lambda: scenes._generate_scenes(runlist, loaded, SCENELIST_NAME, pdf_url), # pylint: disable=protected-access
+        "serialize": lambda: scene_writer.write_scene_collection(collection, output_filename, indent=config.SCENES_JSON_INDENT),
+        "end_to_end": end_to_end,
+    }
+
+    result = {"sources": source_count, "rows": row_count, "templates_bytes": os.path.getsize(templates_filename)}
+    for stage in STAGES:
+        result[f"{stage}_s"] = best_time(functions[stage], runs)
+        result[f"{stage}_peak_bytes"] = peak_memory(functions[stage])
+    return result
+
+def compare(results, baseline, tolerance):
+    problems = []
+    baseline_cases = {(case["sources"], case["rows"]): case for case in baseline.get("cases", [])}
+    for case in results["cases"]:
+        old = baseline_cases.get((case["sources"], case["rows"]))
+        if old is None:
+            continue
+        for stage in STAGES:
+            for key, min_delta in ((f"{stage}_s", MIN_TIME_DELTA), (f"{stage}_peak_bytes", MIN_MEMORY_DELTA)):
+                if key not in old:
+                    continue
+                if case[key] > old[key] * (1 + tolerance) and case[key] - old[key] > min_delta:
+                    problems.append(f"{case['sources']} sources x {case['rows']} rows: {key} regressed: "
+                                    f"{case[key]:.4g} vs baseline {old[key]:.4g}")
+    return problems
+
+def _sizes(text):
+    return [int(size) for size in text.split(",") if size]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scene generation with synthetic templates and runlists.")
+    parser.add_argument("--sources", type=_sizes, default=[10, 100, 1000, 5000],
+                        help="comma-separated template source counts (default: 10,100,1000,5000)")
+    parser.add_argument("--rows", type=_sizes, default=[10, 100, 500, 2000],
+                        help="comma-separated runlist row counts (default: 10,100,500,2000)")
+    parser.add_argument("--quick", action="store_true", help="only 10 and 100 sources and rows")
+    parser.add_argument("--runs", type=int, default=3, help="take the best of this many runs (default: 3)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", default=BASELINE_FNAME,
+                        help="compare against results previously written with --output (default: benchmark-baseline.json)")
+    parser.add_argument("--no-baseline", dest="baseline", action="store_const", const=None,
+                        help="don't compare against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown relative to the baseline (default: 0.25)")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.sources, args.rows = [10, 100], [10, 100]
+
+    # Read before running, in case --output replaces it
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    work_directory = tempfile.mkdtemp(prefix="scenegen-benchmark-")
+    config.OBS_SCENES_DIRECTORY = os.path.join(work_directory, "scenes") + "/"
+    config.PDF_SLIDES_DIRECTORY = os.path.join(work_directory, "slides") + "/"
+    config.CACHE_DIRECTORY = os.path.join(work_directory, "cache") + "/"
+    config.INCREMENTAL_REGENERATION = False
+    config.OUTPUT_BACKEND = "file"
+    config.SHARED_BROWSER_TEMPLATES = ()
+    config.SLIDE_RENDERING = "browser"
+    config.OFFLINE = False
+    for directory in (config.OBS_SCENES_DIRECTORY, config.PDF_SLIDES_DIRECTORY, config.CACHE_DIRECTORY):
+        os.makedirs(directory)
+
+    results = {"python": sys.version.split()[0], "runs": args.runs, "cases": []}
+    try:
+        with fake_google.FakeGoogleServer() as server:
+            server.use_server()
+            for source_count in args.sources:
+                for row_count in args.rows:
+                    case = run_case(source_count, row_count, server, args.runs)
+                    print(f"{source_count:5d} sources x {row_count:5d} rows: " +
+                          ", ".join(f"{stage} {case[f'{stage}_s'] * 1000:.1f} ms" for stage in STAGES), flush=True)
+                    results["cases"].append(case)
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
+    else:
+        print(json.dumps(results, indent=4))
+
+    if baseline is not None:
+        problems = compare(results, baseline, args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if not problems:
+            print(f"No regressions against {args.baseline}")
+        return 1 if problems else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,11 +7,75 @@ MODE = "windows"
 if MODE == "linux":
     OBS_SCENES_DIRECTORY = "./scenes/"
     PDF_SLIDES_DIRECTORY = "./slides/"
+    CACHE_DIRECTORY = "./cache/"
 elif MODE == "don-windows":
     OBS_SCENES_DIRECTORY = "c:/Users/dpb/AppData/Roaming/obs-studio/basic/scenes/"
     PDF_SLIDES_DIRECTORY = "c:/Users/dpb/Slides/"
+    CACHE_DIRECTORY = "c:/Users/dpb/AppData/Local/scenegen/"
 else:
     OBS_SCENES_DIRECTORY = "c:/Users/SaintMarks/AppData/Roaming/obs-studio/basic/scenes/"
     PDF_SLIDES_DIRECTORY = "c:/Users/SaintMarks/Slides/"
+    CACHE_DIRECTORY = "c:/Users/SaintMarks/AppData/Local/scenegen/"
 
 TEMPLATES_FNAME = "templates.json"
+
+# Indentation of the generated scene collection; None writes compact JSON.
+SCENES_JSON_INDENT = 4
+
+# Shared HTTP client used for all Google Sheets and Drive requests (see http_client.py).
+HTTP_CONNECT_TIMEOUT = 5      # seconds
+HTTP_READ_TIMEOUT = 60        # seconds between bytes, not for the whole download
+HTTP_RETRIES = 3
+HTTP_BACKOFF_FACTOR = 0.5     # retries sleep 0.5s, 1s, 2s, ...
+HTTP_POOL_SIZE = 8
+
+# Base URLs of the Google endpoints, e.g. pointed at a local fake_google.py server for
+# benchmarks and load tests.
+SHEETS_API_URL = "https://sheets.googleapis.com"
+SHEETS_DOCS_URL = "https://docs.google.com"
+DRIVE_API_URL = "https://www.googleapis.com"
+DRIVE_DOWNLOAD_URL = "https://drive.google.com"
+
+# Spreadsheet metadata (sheet name -> URL) is cached in memory and in CACHE_DIRECTORY.
+SHEET_URLS_CACHE_TTL = 600    # seconds
+SHEET_URLS_CACHE_SIZE = 16    # spreadsheets
+
+# PDF downloads from Google Drive
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # bytes per read/write
+DOWNLOAD_RESUME_ATTEMPTS = 5       # times an interrupted transfer is resumed
+
+# Downloaded slide decks are kept in CACHE_DIRECTORY/pdfs/, least recently used evicted first.
+PDF_CACHE_BUDGET = 2 * 1024 * 1024 * 1024  # bytes
+
+# Offline mode: with OFFLINE = True, spreadsheet and Drive requests are answered from the
+# snapshot in SNAPSHOT_DIRECTORY (take one with snapshot.py) and nothing touches the network.
+OFFLINE = False
+SNAPSHOT_DIRECTORY = f"{CACHE_DIRECTORY}snapshot/"
+
+# The parsed and indexed templates.json is kept in memory and pickled to CACHE_DIRECTORY/templates/,
+# and only rebuilt when the file's size or modification time changes (see template_cache.py).
+CACHE_TEMPLATES = True
+
+# Timing traces: with TRACE_DIRECTORY set, every run writes a Chrome/Perfetto trace there
+# (see tracing.py); PROFILE_RUNS also writes a cProfile dump of the run.
+TRACE_DIRECTORY = None
+PROFILE_RUNS = False
+
+# Diff against an existing scene collection instead of regenerating it from scratch,
+# keeping scene and browser UUIDs stable for rows that are still in the runlist.
+INCREMENTAL_REGENERATION = False
+
+# Where generated scenes go: "file" writes <scenelist>.json for OBS to load, "websocket"
+# creates/updates them in a running OBS through obs-websocket (see obs_websocket.py).
+OUTPUT_BACKEND = "file"
+OBS_WEBSOCKET_URL = "ws://localhost:4455"
+OBS_WEBSOCKET_PASSWORD = None
+
+# Scene templates whose generated scenes all share one browser source, switched to each
+# scene's page by a generated OBS script, instead of one browser source per scene.
+SHARED_BROWSER_TEMPLATES = ()
+
+# How slides are shown: "browser" loads the PDF in a browser source per scene; "image"
+# renders the pages the runlist uses to PNGs (needs PyMuPDF) and uses image sources.
+SLIDE_RENDERING = "browser"
+RASTER_WORKERS = None  # processes used for rendering; None uses every CPU core
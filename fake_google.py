@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+"""
+A local stand-in for the Google Sheets and Drive endpoints google_sheets and
+google_drive use, for exercising them (and benchmarking the whole pipeline) without
+Google. It serves spreadsheets and files held in memory:
+
+    Sheets v4 metadata and values:batchGet    {SHEETS_API_URL}/v4/spreadsheets/...
+    CSV export, with ETags                    {SHEETS_DOCS_URL}/spreadsheets/d/<id>/export?format=csv&gid=
+    Drive v3 file metadata                    {DRIVE_API_URL}/drive/v3/files/<id>
+    Drive download, with ETags, Range and     {DRIVE_DOWNLOAD_URL}/uc?id=<id>&export=download
+    the download_warning confirm cookie
+
+Point the config.*_URL settings at server.url (use_server() does that) to use it.
+Responses can be slowed down by a fixed latency and a bandwidth cap, and a fraction of
+them can fail with a 503 or be cut off part way through the body.
+
+Example:
+    with FakeGoogleServer(latency=0.05, bandwidth=2_000_000) as google:
+        google.add_spreadsheet("abc123", {"Map": [["2026-10-18", google.file_url("deck")]], "2026-10-18": rows})
+        google.add_file("deck", pdf_bytes, large=True)
+        google.use_server()
+        gs.download_sheet(google.spreadsheet_url("abc123", gid=1))
+
+    fake_google.py --port 8765 --snapshot ./snapshot/ --latency 0.1 --error-rate 0.05
+"""
+
+import argparse
+import base64
+import csv
+import datetime
+import hashlib
+import http.server
+import io
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+
+import config
+
+BODY_CHUNK_SIZE = 64 * 1024
+
+class FakeGoogleServer:
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, bandwidth=None, error_rate=0.0, drop_rate=0.0, seed=None):
+        """
+        latency: seconds to wait before every response
+        bandwidth: bytes per second that response bodies are sent at, or None for no cap
+        error_rate: fraction of requests answered with 503 Service Unavailable
+        drop_rate: fraction of Drive downloads whose connection is closed half way through the body
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.spreadsheets = {}  # spreadsheet ID -> {tab name: (gid, rows)}
+        self.files = {}         # Drive file ID -> {"content", "etag", "md5", "modified", "large"}
+        self.requests = []      # request paths, in the order they arrived
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def use_server(self):
+        """Point the Google base URLs in config at this server."""
+        config.SHEETS_API_URL = config.SHEETS_DOCS_URL = self.url
+        config.DRIVE_API_URL = config.DRIVE_DOWNLOAD_URL = self.url
+
+    def add_spreadsheet(self, spreadsheet_id, tabs, gids=None):
+        """
+        Serve tabs ({tab name: rows}) as a spreadsheet. Tabs get gids 0, 1, 2, ... in
+        order unless gids ({tab name: gid}) says otherwise.
+        """
+        gids = gids or {}
+        with self._lock:
+            self.spreadsheets[spreadsheet_id] = {name: (int(gids.get(name, index)), [list(row) for row in rows])
+                                                 for index, (name, rows) in enumerate(tabs.items())}
+
+    def add_file(self, file_id, content, large=False):
+        """
+        Serve content as the Drive file file_id. Downloads of a large file first get
+        Drive's "can't scan for viruses" page and a download_warning cookie to confirm with.
+        """
+        md5 = hashlib.md5(content)
+        with self._lock:
+            self.files[file_id] = {"content": bytes(content), "large": large,
+                                   "etag": f'"{md5.hexdigest()}"', "md5": md5,
+                                   "modified": datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")}
+
+    def spreadsheet_url(self, spreadsheet_id, gid=0):
+        return f"{self.url}/spreadsheets/d/{spreadsheet_id}/edit#gid={gid}"
+
+    def file_url(self, file_id):
+        return f"{self.url}/file/d/{file_id}/view?usp=sharing"
+
+    ##
+    ## Request handling
+    ##
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args): # pylint: disable=redefined-builtin
+                pass
+
+            def do_GET(self): # pylint: disable=invalid-name
+                server.requests.append(self.path)
+                if server.latency:
+                    time.sleep(server.latency)
+                if server.error_rate and server.chance(server.error_rate):
+                    status, headers, body = 503, {"Content-Type": "text/plain", "Retry-After": "0"}, b"Service Unavailable"
+                else:
+                    status, headers, body = server.route(self.path, self.headers)
+                drop = status in (200, 206) and headers.pop("X-Fake-Droppable", None) and server.chance(server.drop_rate)
+
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                if drop:
+                    self.send_header("Connection", "close")
+                self.end_headers()
+                server.send_body(self.wfile, body[:len(body) // 2] if drop else body)
+                if drop:
+                    self.close_connection = True
+
+        return Handler
+
+    def chance(self, rate):
+        with self._lock:
+            return self._random.random() < rate
+
+    def send_body(self, wfile, body):
+        if not self.bandwidth:
+            wfile.write(body)
+            return
+        started = time.monotonic()
+        for offset in range(0, len(body), BODY_CHUNK_SIZE):
+            chunk = body[offset:offset + BODY_CHUNK_SIZE]
+            wfile.write(chunk)
+            wfile.flush()
+            # Sleep until the bytes sent so far fit the bandwidth cap
+            delay = (offset + len(chunk)) / self.bandwidth - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+
+    def route(self, path, headers):
+        """Return (status, headers, body) for a GET of path."""
+        parsed = urllib.parse.urlparse(path)
+        query = urllib.parse.parse_qs(parsed.query)
+
+        sheet_routes = [
+            (r"/v4/spreadsheets/([^/]+)/values:batchGet", self._batch_get),
+            (r"/v4/spreadsheets/([^/]+)", self._metadata),
+            (r"/spreadsheets/d/([^/]+)/export", self._export),
+        ]
+        for pattern, handler in sheet_routes:
+            if match := re.fullmatch(pattern, parsed.path):
+                with self._lock:
+                    tabs = self.spreadsheets.get(match.group(1))
+                if tabs is None:
+                    return _json_response(404, {"error": {"code": 404, "message": "Requested entity was not found."}})
+                return handler(tabs, query, headers)
+
+        if match := re.fullmatch(r"/drive/v3/files/([^/]+)", parsed.path):
+            return self._file_metadata(match.group(1))
+        if parsed.path == "/uc":
+            return self._download(query, headers)
+        return 404, {"Content-Type": "text/plain"}, b"Not Found"
+
+    def _metadata(self, tabs, _query, _headers):
+        return _json_response(200, {"sheets": [{"properties": {"sheetId": gid, "title": name, "index": index}}
+                                               for index, (name, (gid, _)) in enumerate(tabs.items())]})
+
+    def _batch_get(self, tabs, query, _headers):
+        value_ranges = []
+        for sheet_range in query.get("ranges", []):
+            name = sheet_range[1:-1].replace("''", "'") if sheet_range.startswith("'") else sheet_range
+            if name not in tabs:
+                return _json_response(400, {"error": {"code": 400, "message": f"Unable to parse range: {sheet_range}"}})
+            # Like the real API, trailing empty cells and rows are left out
+            rows = [list(row) for row in tabs[name][1]]
+            for row in rows:
+                while row and row[-1] == "":
+                    row.pop()
+            while rows and not rows[-1]:
+                rows.pop()
+            value_range = {"range": sheet_range, "majorDimension": "ROWS"}
+            if rows:
+                value_range["values"] = rows
+            value_ranges.append(value_range)
+        return _json_response(200, {"valueRanges": value_ranges})
+
+    def _export(self, tabs, query, headers):
+        gid = int(query.get("gid", ["0"])[0])
+        rows = next((rows for tab_gid, rows in tabs.values() if tab_gid == gid), None)
+        if rows is None:
+            return 400, {"Content-Type": "text/html"}, b"<html>Bad gid</html>"
+        width = max((len(row) for row in rows), default=0)
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\r\n").writerows(row + [""] * (width - len(row)) for row in rows)
+        body = buffer.getvalue().encode("utf-8")
+
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"Content-Type": "text/csv; charset=utf-8", "ETag": etag}, body
+
+    def _file_metadata(self, file_id):
+        with self._lock:
+            entry = self.files.get(file_id)
+        if entry is None:
+            return _json_response(404, {"error": {"code": 404, "message": f"File not found: {file_id}."}})
+        return _json_response(200, {"md5Checksum": entry["md5"].hexdigest(), "size": str(len(entry["content"])),
+                                    "modifiedTime": entry["modified"], "headRevisionId": entry["etag"].strip('"')})
+
+    def _download(self, query, headers):
+        file_id = query.get("id", [""])[0]
+        with self._lock:
+            entry = self.files.get(file_id)
+        if entry is None:
+            return 404, {"Content-Type": "text/html"}, b"<html>Sorry, the file you have requested does not exist.</html>"
+
+        token = hashlib.sha1(entry["etag"].encode("ascii")).hexdigest()[:12]
+        if entry["large"] and query.get("confirm", [None])[0] != token:
+            return 200, {"Content-Type": "text/html; charset=utf-8",
+                         "Set-Cookie": f"download_warning_{file_id}={token}; Path=/"}, \
+                   b"<html>Google Drive can't scan this file for viruses. <a href='...'>Download anyway</a></html>"
+
+        content = entry["content"]
+        response_headers = {"Content-Type": "application/pdf", "ETag": entry["etag"], "Accept-Ranges": "bytes",
+                            "X-Goog-Hash": f"crc32c=AAAAAA==,md5={base64.b64encode(entry['md5'].digest()).decode('ascii')}",
+                            "X-Fake-Droppable": "1"}
+
+        range_match = re.fullmatch(r"bytes=(\d+)-(\d*)", headers.get("Range", ""))
+        if_range = headers.get("If-Range")
+        if range_match and (if_range is None or if_range == entry["etag"]):
+            start = int(range_match.group(1))
+            end = int(range_match.group(2)) if range_match.group(2) else len(content) - 1
+            if start >= len(content):
+                return 416, {"Content-Range": f"bytes */{len(content)}"}, b""
+            end = min(end, len(content) - 1)
+            response_headers["Content-Range"] = f"bytes {start}-{end}/{len(content)}"
+            return 206, response_headers, content[start:end + 1]
+        return 200, response_headers, content
+
+    def load_snapshot(self, directory):
+        """Serve the spreadsheet and slides in a snapshot taken with snapshot.py."""
+        with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+        spreadsheet_id = manifest["spreadsheet_id"]
+        tabs, gids = {}, {}
+        for name, sheet_url in manifest["sheet_urls"].items():
+            gid = re.search(r"gid=([0-9]+)", sheet_url).group(1)
+            entry = manifest["sheets"].get(f"{spreadsheet_id}-{gid}")
+            if entry is None:
+                continue
+            with open(os.path.join(directory, entry), "r", encoding="utf-8") as file:
+                tabs[name] = json.load(file)
+            gids[name] = gid
+        self.add_spreadsheet(spreadsheet_id, tabs, gids)
+        for file_id, entry in manifest["files"].items():
+            with open(os.path.join(directory, entry["filename"]), "rb") as file:
+                self.add_file(file_id, file.read(), large=True)
+        return spreadsheet_id
+
+def _json_response(status, data):
+    return status, {"Content-Type": "application/json; charset=UTF-8"}, json.dumps(data).encode("utf-8")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve fake Google Sheets and Drive endpoints locally.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--snapshot", help="serve the spreadsheet and slides of this snapshot directory")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--bandwidth", type=float, help="bytes per second for response bodies")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of downloads cut off half way")
+    parser.add_argument("--seed", type=int, help="seed for the injected failures")
+    args = parser.parse_args(argv)
+
+    server = FakeGoogleServer(port=args.port, latency=args.latency, bandwidth=args.bandwidth,
+                              error_rate=args.error_rate, drop_rate=args.drop_rate, seed=args.seed)
+    if args.snapshot:
+        spreadsheet_id = server.load_snapshot(args.snapshot)
+        print(f"Serving {server.spreadsheet_url(spreadsheet_id)}")
+    print(f"Fake Google listening on {server.url}; set the config.*_URL base URLs to it")
+    server.start()
+    try:
+        server._thread.join() # pylint: disable=protected-access
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+"""
+A local stand-in for OBS's obs-websocket v5 server, for exercising obs_websocket
+without a running OBS. It keeps scenes, inputs and scene items in memory and
+implements just the requests obs_websocket uses.
+
+Example:
+    with FakeObsServer(password="secret") as obs:
+        with obs_websocket.ObsWebSocket(obs.url, "secret") as client:
+            ...
+        print(obs.scenes, obs.messages)
+"""
+
+import json
+import threading
+import uuid
+
+from websockets.sync.server import serve
+
+import obs_websocket as ows
+
+class RequestFailed(Exception):
+    def __init__(self, code, comment):
+        super().__init__(comment)
+        self.code = code
+        self.comment = comment
+
+class FakeObsServer:
+
+    def __init__(self, host="127.0.0.1", port=0, password=None):
+        self.password = password
+        self.scenes = {}    # scene name -> {"sceneUuid": ..., "items": [{"sceneItemId", "sourceName", "enabled", "transform"}]}
+        self.inputs = {}    # input name -> {"inputUuid": ..., "inputKind": ..., "inputSettings": {...}}
+        self.messages = []  # (op, request types) for every message received after Identify
+        self._next_item_id = 1
+        self._lock = threading.Lock()
+        self._server = serve(self._handle, host, port, subprotocols=[ows.SUBPROTOCOL], max_size=None)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.socket.getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def add_scene(self, scene_name):
+        with self._lock:
+            self._create_scene({"sceneName": scene_name})
+
+    def add_input(self, input_name, input_kind="image_source", input_settings=None):
+        with self._lock:
+            self.inputs[input_name] = {"inputUuid": str(uuid.uuid4()), "inputKind": input_kind,
+                                       "inputSettings": dict(input_settings or {})}
+
+    ##
+    ## Connection handling
+    ##
+
+    def _handle(self, connection):
+        def send(op, data):
+            connection.send(json.dumps({"op": op, "d": data}))
+
+        hello = {"obsWebSocketVersion": "5.0.0-fake", "rpcVersion": ows.RPC_VERSION}
+        challenge = salt = None
+        if self.password:
+            challenge, salt = uuid.uuid4().hex, uuid.uuid4().hex
+            hello["authentication"] = {"challenge": challenge, "salt": salt}
+        send(ows.OP_HELLO, hello)
+
+        identify = json.loads(connection.recv())
+        if identify["op"] != ows.OP_IDENTIFY:
+            connection.close(4007, "Not identified")
+            return
+        if self.password and identify["d"].get("authentication") != ows.authentication_string(self.password, salt, challenge):
+            connection.close(4009, "Authentication failed")
+            return
+        send(ows.OP_IDENTIFIED, {"negotiatedRpcVersion": ows.RPC_VERSION})
+
+        for raw in connection:
+            message = json.loads(raw)
+            data = message["d"]
+            if message["op"] == ows.OP_REQUEST:
+                self.messages.append((ows.OP_REQUEST, [data["requestType"]]))
+                response = self._execute(data["requestType"], data.get("requestData", {}))
+                response.update({"requestType": data["requestType"], "requestId": data["requestId"]})
+                send(ows.OP_REQUEST_RESPONSE, response)
+            elif message["op"] == ows.OP_REQUEST_BATCH:
+                self.messages.append((ows.OP_REQUEST_BATCH, [request["requestType"] for request in data["requests"]]))
+                results = []
+                for request in data["requests"]:
+                    result = self._execute(request["requestType"], request.get("requestData", {}))
+                    result["requestType"] = request["requestType"]
+                    results.append(result)
+                    if data.get("haltOnFailure") and not result["requestStatus"]["result"]:
+                        break
+                send(ows.OP_REQUEST_BATCH_RESPONSE, {"requestId": data["requestId"], "results": results})
+
+    def _execute(self, request_type, request_data):
+        # e.g. CreateSceneItem -> _create_scene_item
+        handler = getattr(self, "_" + "".join("_" + c.lower() if c.isupper() else c for c in request_type).lstrip("_"), None)
+        if handler is None:
+            return {"requestStatus": {"result": False, "code": 204, "comment": f"Unknown request type {request_type}"}}
+        try:
+            with self._lock:
+                response_data = handler(request_data)
+        except RequestFailed as e:
+            return {"requestStatus": {"result": False, "code": e.code, "comment": e.comment}}
+        except KeyError as e:
+            return {"requestStatus": {"result": False, "code": 300, "comment": f"Missing request field {e}"}}
+        result = {"requestStatus": {"result": True, "code": 100}}
+        if response_data is not None:
+            result["responseData"] = response_data
+        return result
+
+    ##
+    ## Requests
+    ##
+
+    def _scene(self, scene_name):
+        if scene_name not in self.scenes:
+            raise RequestFailed(600, f"No scene named {scene_name}")
+        return self.scenes[scene_name]
+
+    def _add_item(self, scene_name, source_name, enabled):
+        item = {"sceneItemId": self._next_item_id, "sourceName": source_name, "enabled": enabled, "transform": {}}
+        self._next_item_id += 1
+        self._scene(scene_name)["items"].append(item)
+        return item["sceneItemId"]
+
+    def _get_scene_list(self, _data):
+        return {"scenes": [{"sceneName": name, "sceneUuid": scene["sceneUuid"], "sceneIndex": index}
+                           for index, (name, scene) in enumerate(self.scenes.items())]}
+
+    def _get_input_list(self, data):
+        kind = data.get("inputKind")
+        return {"inputs": [{"inputName": name, "inputUuid": source["inputUuid"], "inputKind": source["inputKind"]}
+                           for name, source in self.inputs.items() if kind is None or source["inputKind"] == kind]}
+
+    def _create_scene(self, data):
+        if data["sceneName"] in self.scenes or data["sceneName"] in self.inputs:
+            raise RequestFailed(601, f"A source named {data['sceneName']} already exists")
+        scene_uuid = str(uuid.uuid4())
+        self.scenes[data["sceneName"]] = {"sceneUuid": scene_uuid, "items": []}
+        return {"sceneUuid": scene_uuid}
+
+    def _remove_scene(self, data):
+        self._scene(data["sceneName"])
+        del self.scenes[data["sceneName"]]
+
+    def _create_input(self, data):
+        if data["inputName"] in self.inputs or data["inputName"] in self.scenes:
+            raise RequestFailed(601, f"A source named {data['inputName']} already exists")
+        self._scene(data["sceneName"])
+        input_uuid = str(uuid.uuid4())
+        self.inputs[data["inputName"]] = {"inputUuid": input_uuid, "inputKind": data["inputKind"],
+                                          "inputSettings": dict(data.get("inputSettings", {}))}
+        scene_item_id = self._add_item(data["sceneName"], data["inputName"], data.get("sceneItemEnabled", True))
+        return {"inputUuid": input_uuid, "sceneItemId": scene_item_id}
+
+    def _set_input_settings(self, data):
+        if data["inputName"] not in self.inputs:
+            raise RequestFailed(600, f"No input named {data['inputName']}")
+        source = self.inputs[data["inputName"]]
+        if data.get("overlay", True):
+            source["inputSettings"].update(data["inputSettings"])
+        else:
+            source["inputSettings"] = dict(data["inputSettings"])
+
+    def _create_scene_item(self, data):
+        if data["sourceName"] not in self.inputs and data["sourceName"] not in self.scenes:
+            raise RequestFailed(600, f"No source named {data['sourceName']}")
+        return {"sceneItemId": self._add_item(data["sceneName"], data["sourceName"], data.get("sceneItemEnabled", True))}
+
+    def _set_scene_item_transform(self, data):
+        for item in self._scene(data["sceneName"])["items"]:
+            if item["sceneItemId"] == data["sceneItemId"]:
+                item["transform"].update(data["sceneItemTransform"])
+                return None
+        raise RequestFailed(600, f"No scene item {data['sceneItemId']} in {data['sceneName']}")
+
+def main():
+    server = FakeObsServer(port=4455)
+    print(f"Fake OBS listening on {server.url}")
+    server.start()
+    try:
+        server._thread.join() # pylint: disable=protected-access
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -7,60 +7,243 @@
 # pylint: disable=missing-function-docstring
 # pylint: disable=too-many-instance-attributes
 
+import base64
+import hashlib
+import os
 import re
+import shutil
+import time
 
-import requests
+import atomic_file
+import config
+import http_client
+import progress
+import tracing
 
-def download_to_local_filesystem(url, filename):
+class DownloadError(Exception):
+    pass
+
+def extract_file_id(url):
+    file_id_match = re.search(r"(?:/d/|id=|/file/d/|open\?id=)([a-zA-Z0-9_-]+)", url)
+    if not file_id_match:
+        return None
+    return file_id_match.group(1)
+
+@tracing.traced()
+def get_file_metadata(file_id, api_key):
+    """
+    Fetch the Drive metadata that identifies a file's current content. Returns a dict
+    with whichever of md5Checksum, headRevisionId, modifiedTime and size Drive reports.
+    """
+    if config.OFFLINE:
+        import snapshot # pylint: disable=import-outside-toplevel
+        return snapshot.current().file_metadata(file_id)
+
+    metadata_url = f"{config.DRIVE_API_URL}/drive/v3/files/{file_id}?fields=md5Checksum,headRevisionId,modifiedTime,size&key={api_key}"
+    response = http_client.get(metadata_url)
+    if response.status_code != 200:
+        raise Exception(f"Error fetching file metadata: {response.status_code} - {response.text}")
+    return response.json()
+
+def _open_download(download_url, offset, validator):
+    """
+    Start (or resume from offset) a Drive download, following the download_warning
+    confirmation that Drive uses for larger files. Returns the final URL and response.
+    """
+    headers = {"Accept-Encoding": "identity"}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        if validator:
+            headers["If-Range"] = validator
+
+    response = http_client.get(download_url, headers=headers, stream=True)
+
+    # Check if there's a download warning (for larger files)
+    for key, value in response.cookies.items():
+        if key.startswith('download_warning'):
+            # Add the confirmation token to the URL
+            download_url = f"{download_url}&confirm={value}"
+            response.close()
+            response = http_client.get(download_url, headers=headers, stream=True)
+            break
+
+    return download_url, response
+
+def _expected_md5(response):
+    """The base64 MD5 Google sends in X-Goog-Hash (or Content-MD5 on a full response), if any."""
+    for part in response.headers.get("X-Goog-Hash", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name == "md5" and value:
+            return value
+    if response.status_code == 200:
+        return response.headers.get("Content-MD5")
+    return None
+
+def _file_md5(filename, chunk_size):
+    digest = hashlib.md5()
+    with open(filename, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return base64.b64encode(digest.digest()).decode("ascii")
+
+def _transfer(response, part_filename, offset, chunk_size, reporter=None):
+    """
+    Write the body of response to part_filename, appending for a 206 that continues at
+    offset and truncating otherwise. Returns the expected size of the whole file, or
+    None if the server didn't say.
+    """
+    if response.status_code == 206:
+        content_range = re.match(r"bytes (\d+)-\d+/(\d+|\*)", response.headers.get("Content-Range", ""))
+        if not content_range or int(content_range.group(1)) != offset:
+            raise DownloadError(f"Unexpected Content-Range: {response.headers.get('Content-Range')}")
+        total = content_range.group(2)
+        expected_size = None if total == "*" else int(total)
+        mode = "ab"
+    elif response.status_code == 200:
+        content_length = response.headers.get("Content-Length")
+        expected_size = int(content_length) if content_length else None
+        mode = "wb"
+    else:
+        raise DownloadError(f"Failed to download file. Status code: {response.status_code}")
+
+    started = time.monotonic()
+    received = 0
+    with tracing.span("transfer", status=response.status_code, offset=offset) as span, open(part_filename, mode) as f:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if chunk:
+                f.write(chunk)
+                received += len(chunk)
+                if reporter:
+                    reporter.check()
+                    rate = received / max(time.monotonic() - started, 1e-6)
+                    reporter.report("download", f"{(offset + received) / 1e6:.1f} MB at {rate / 1e6:.1f} MB/s",
+                                    done=offset + received, total=expected_size)
+        span.set(bytes=received)
+
+    return expected_size
+
+def _copy_from_snapshot(file_id, filename):
+    import snapshot # pylint: disable=import-outside-toplevel
+    try:
+        with atomic_file.replacing(filename) as temp_filename:
+            shutil.copyfile(snapshot.current().file_path(file_id), temp_filename)
+    except Exception as e:
+        print(f"Error copying the slides from the offline snapshot: {e}")
+        return False
+    print(f"File copied from the offline snapshot to {filename}")
+    return True
+
+@tracing.traced()
+def download_to_local_filesystem(url, filename, chunk_size=None, reporter=None):
     """
     Downloads a file from Google Drive and saves it locally.
 
+    The file is written to filename + ".part" in large chunks and only renamed to
+    filename once its size matches what the server announced and, when Google sends
+    one, its MD5 matches. An interrupted transfer is resumed with a Range request,
+    both within this call and, when the server gave an ETag, on the next call. In
+    offline mode the file is copied from the snapshot (see snapshot.py) instead.
+
     Parameters:
     url (str): The Google Drive URL with "anyone can view" permissions
     filename (str): The local path where the file should be saved
+    chunk_size (int): Bytes per read/write; defaults to config.DOWNLOAD_CHUNK_SIZE
+    reporter (progress.ProgressReporter): Receives bytes downloaded and can cancel the transfer
 
     Returns:
     bool: True if successful, False otherwise
     """
     # Extract the file ID from the URL
-    file_id_match = re.search(r"(?:/d/|id=|/file/d/|open\?id=)([a-zA-Z0-9_-]+)", url)
-    if not file_id_match:
+    file_id = extract_file_id(url)
+    if file_id is None:
         print(f"Could not extract file ID from URL: {url}")
         return False
 
-    file_id = file_id_match.group(1)
+    chunk_size = chunk_size or config.DOWNLOAD_CHUNK_SIZE
+
+    if config.OFFLINE:
+        return _copy_from_snapshot(file_id, filename)
 
     # Direct download link for Google Drive files
-    download_url = f"https://drive.google.com/uc?id={file_id}&export=download"
+    download_url = f"{config.DRIVE_DOWNLOAD_URL}/uc?id={file_id}&export=download"
 
-    # For larger files, Google Drive might show a confirmation page
-    # This session approach helps handle that
-    session = requests.Session()
+    part_filename = f"{filename}.part"
+    etag_filename = f"{part_filename}.etag"
 
-    # Get the initial response
-    response = session.get(download_url, stream=True)
+    # A partial file left by an earlier run can only be resumed if we know which version it is
+    validator = None
+    if os.path.exists(etag_filename):
+        with open(etag_filename, "r", encoding="utf-8") as f:
+            validator = f.read().strip() or None
+    if validator is None and os.path.exists(part_filename):
+        os.remove(part_filename)
 
-    # Check if there's a download warning (for larger files)
-    for key, value in response.cookies.items():
-        if key.startswith('download_warning'):
-            # Add the confirmation token to the URL
-            download_url = f"{download_url}&confirm={value}"
-            response = session.get(download_url, stream=True)
-            break
+    expected_size = None
+    expected_md5 = None
+    attempts = 0
+    try:
+        while True:
+            if reporter:
+                reporter.check()
+            offset = os.path.getsize(part_filename) if os.path.exists(part_filename) else 0
+            download_url, response = _open_download(download_url, offset, validator)
+            try:
+                if reporter:
+                    reporter.track(response)
+                if response.status_code == 416:
+                    # Our partial file doesn't fit the file on the server; start over
+                    os.remove(part_filename)
+                    validator = None
+                    continue
 
-    # Check if the request was successful
-    if response.status_code != 200:
-        print(f"Failed to download file. Status code: {response.status_code}")
-        return False
+                if response.status_code == 200:
+                    # A full response, either a fresh start or the server declining to resume
+                    validator = response.headers.get("ETag")
+                    if validator:
+                        with open(etag_filename, "w", encoding="utf-8") as f:
+                            f.write(validator)
+                    elif os.path.exists(etag_filename):
+                        os.remove(etag_filename)
 
-    # Save the file
-    try:
-        with open(filename, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=1024):
-                if chunk:
-                    f.write(chunk)
+                expected_md5 = _expected_md5(response) or expected_md5
+                expected_size = _transfer(response, part_filename, offset, chunk_size, reporter)
+                if reporter:
+                    reporter.check()
+                if expected_size is None or os.path.getsize(part_filename) >= expected_size:
+                    break
+                attempts += 1
+                if attempts > config.DOWNLOAD_RESUME_ATTEMPTS:
+                    break
+                print("Download ended early; resuming")
+            except http_client.TRANSFER_ERRORS as e:
+                if reporter:
+                    reporter.check()
+                attempts += 1
+                if attempts > config.DOWNLOAD_RESUME_ATTEMPTS:
+                    raise
+                print(f"Download interrupted ({e}); resuming")
+            finally:
+                if reporter:
+                    reporter.untrack(response)
+                response.close()
+
+        actual_size = os.path.getsize(part_filename)
+        if expected_size is not None and actual_size != expected_size:
+            raise DownloadError(f"Downloaded {actual_size} bytes, expected {expected_size}")
+        if expected_md5 is not None and _file_md5(part_filename, chunk_size) != expected_md5:
+            os.remove(part_filename)
+            raise DownloadError("Downloaded file failed its MD5 check")
+
+        os.replace(part_filename, filename)
+        if os.path.exists(etag_filename):
+            os.remove(etag_filename)
         print(f"File successfully downloaded to {filename}")
         return True
+    except progress.Cancelled:
+        raise
+    except DownloadError as e:
+        print(e)
+        return False
     except Exception as e:
         print(f"Error saving file: {e}")
         return False
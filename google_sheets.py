@@ -7,25 +7,142 @@
 # pylint: disable=missing-function-docstring
 # pylint: disable=too-many-instance-attributes
 
+import codecs
+import collections
+import concurrent.futures
 import csv
-import io
+import json
+import os
 import re
+import threading
+import time
+import urllib.parse
 
-import requests
+import atomic_file
+import config
+import http_client
+import tracing
 
-def get_sheet_urls(spreadsheet_url, api_key):
+class SheetUrlsCache:
     """
-    Given a public Google Sheets URL and an API key, return a dict mapping sheet names to their URLs.
+    TTL- and size-bounded cache of get_sheet_urls results, keyed by spreadsheet ID.
+
+    Entries are kept in memory (least recently used evicted first) and mirrored to a
+    JSON file, so validation and generation share one metadata fetch and a restart
+    within the TTL doesn't need one at all.
     """
-    # Extract the spreadsheet ID from the URL
+
+    def __init__(self, filename, ttl, max_entries):
+        self.filename = filename
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = collections.OrderedDict()
+        try:
+            with open(self.filename, "r", encoding="utf-8") as file:
+                saved = json.load(file)
+            for spreadsheet_id, entry in sorted(saved.items(), key=lambda item: item[1]["fetched_at"]):
+                self._entries[spreadsheet_id] = (entry["fetched_at"], entry["sheet_urls"], entry.get("missing", []))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Ignoring unreadable sheet metadata cache {self.filename}: {e}")
+
+    def _save(self):
+        saved = {spreadsheet_id: {"fetched_at": fetched_at, "sheet_urls": sheet_urls, "missing": missing}
+                 for spreadsheet_id, (fetched_at, sheet_urls, missing) in self._entries.items()}
+        try:
+            atomic_file.write_json(saved, self.filename, ensure_ascii=False)
+        except Exception as e:
+            print(f"Could not save sheet metadata cache {self.filename}: {e}")
+
+    def get(self, spreadsheet_id):
+        entry = self.lookup(spreadsheet_id)
+        return None if entry is None else entry[0]
+
+    def lookup(self, spreadsheet_id):
+        """(sheet_urls, names known to be missing) for a fresh entry, else None."""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(spreadsheet_id)
+            if entry is None:
+                return None
+            fetched_at, sheet_urls, missing = entry
+            if time.time() - fetched_at > self.ttl:
+                del self._entries[spreadsheet_id]
+                return None
+            self._entries.move_to_end(spreadsheet_id)
+            return dict(sheet_urls), set(missing)
+
+    def put(self, spreadsheet_id, sheet_urls, missing=()):
+        """Cache sheet_urls; missing are requested names the fetch confirmed aren't there."""
+        with self._lock:
+            self._load()
+            self._entries[spreadsheet_id] = (time.time(), dict(sheet_urls), sorted(missing))
+            self._entries.move_to_end(spreadsheet_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def invalidate(self, spreadsheet_id=None):
+        with self._lock:
+            self._load()
+            if spreadsheet_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(spreadsheet_id, None)
+            self._save()
+
+_sheet_urls_cache = None
+
+def sheet_urls_cache():
+    global _sheet_urls_cache # pylint: disable=global-statement
+    if _sheet_urls_cache is None:
+        _sheet_urls_cache = SheetUrlsCache(os.path.join(config.CACHE_DIRECTORY, "sheet_urls.json"),
+                                           config.SHEET_URLS_CACHE_TTL,
+                                           config.SHEET_URLS_CACHE_SIZE)
+    return _sheet_urls_cache
+
+def extract_spreadsheet_id(spreadsheet_url):
     match = re.search(r"/spreadsheets/d/([a-zA-Z0-9-_]+)", spreadsheet_url)
     if not match:
         raise ValueError("Invalid Google Sheets URL")
-    spreadsheet_id = match.group(1)
+    return match.group(1)
+
+@tracing.traced()
+def get_sheet_urls(spreadsheet_url, api_key, use_cache=True, required=()):
+    """
+    Given a public Google Sheets URL and an API key, return a dict mapping sheet names to their URLs.
+
+    Results are served from the sheet metadata cache when a fresh entry exists; pass
+    use_cache=False, or call invalidate_sheet_urls(), after adding a tab. If a cached
+    map lacks any of the sheet names in required (say, a tab added since it was
+    cached), the metadata is fetched again, once: names still missing then are
+    remembered with the entry, so asking for them again (e.g. future Sundays'
+    runlists on every batch run) doesn't refetch until the entry expires.
+    """
+    # Extract the spreadsheet ID from the URL
+    spreadsheet_id = extract_spreadsheet_id(spreadsheet_url)
+
+    if config.OFFLINE:
+        import snapshot # pylint: disable=import-outside-toplevel
+        return snapshot.current().sheet_urls(spreadsheet_id)
+
+    if use_cache and (entry := sheet_urls_cache().lookup(spreadsheet_id)) is not None:
+        sheet_urls, known_missing = entry
+        if all(name in sheet_urls or name in known_missing for name in required):
+            return sheet_urls
 
     # Call the Sheets API to get metadata
-    metadata_url = f"https://sheets.googleapis.com/v4/spreadsheets/{spreadsheet_id}?fields=sheets.properties&key={api_key}"
-    response = requests.get(metadata_url) # pylint: disable=missing-timeout
+    metadata_url = f"{config.SHEETS_API_URL}/v4/spreadsheets/{spreadsheet_id}?fields=sheets.properties&key={api_key}"
+    with tracing.span("GET sheet metadata") as span:
+        response = http_client.get(metadata_url)
+        span.set(status=response.status_code, bytes=len(response.content))
     if response.status_code != 200:
         raise Exception(f"Error fetching sheet metadata: {response.status_code} - {response.text}")
 
@@ -36,10 +153,16 @@ def get_sheet_urls(spreadsheet_url, api_key):
         properties = sheet["properties"]
         title = properties["title"]
         gid = properties["sheetId"]
-        sheet_urls[title] = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/edit#gid={gid}"
+        sheet_urls[title] = f"{config.SHEETS_DOCS_URL}/spreadsheets/d/{spreadsheet_id}/edit#gid={gid}"
 
+    sheet_urls_cache().put(spreadsheet_id, sheet_urls, [name for name in required if name not in sheet_urls])
     return sheet_urls
 
+def invalidate_sheet_urls(spreadsheet_url=None):
+    """Drop cached metadata for one spreadsheet, or for all of them when no URL is given."""
+    spreadsheet_id = None if spreadsheet_url is None else extract_spreadsheet_id(spreadsheet_url)
+    sheet_urls_cache().invalidate(spreadsheet_id)
+
 ##
 ## Download the runlist from a Google Sheet
 ##
@@ -47,7 +170,7 @@ def get_sheet_urls(spreadsheet_url, api_key):
 def extract_sheet_id_gid(url):
     """Extract Google Sheet ID from URL."""
     # Pattern for Google Sheets URLs
-    pattern = r'https://docs\.google\.com/spreadsheets/d/([a-zA-Z0-9_-]+)'
+    pattern = r'/spreadsheets/d/([a-zA-Z0-9_-]+)'
     match = re.search(pattern, url)
 
     gidpatt = r'gid=([0-9]+)'
@@ -63,15 +186,109 @@ def extract_sheet_id_gid(url):
     raise ValueError("Invalid Google Sheets URL. Please provide a URL in the format: "
                      "https://docs.google.com/spreadsheets/d/YOUR_SHEET_ID/...")
 
-def download_sheet(url):
+def _sheet_cache_filename(sheet_id, sheet_gid):
+    return os.path.join(config.CACHE_DIRECTORY, "sheets", f"{sheet_id}-{sheet_gid}.json")
+
+def _load_cached_sheet(sheet_id, sheet_gid):
+    try:
+        with open(_sheet_cache_filename(sheet_id, sheet_gid), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable cached sheet {sheet_id} gid {sheet_gid}: {e}")
+        return None
+
+def _save_cached_sheet(sheet_id, sheet_gid, rows, etag=None, last_modified=None):
+    entry = {"etag": etag, "last_modified": last_modified, "rows": rows}
+    try:
+        atomic_file.write_json(entry, _sheet_cache_filename(sheet_id, sheet_gid), ensure_ascii=False)
+    except Exception as e:
+        print(f"Could not cache sheet {sheet_id} gid {sheet_gid}: {e}")
+
+class _SheetCacheWriter:
+    """
+    Writes a sheet's cache entry row by row while it streams in, in the same JSON form
+    as _save_cached_sheet, and only replaces the old entry once every row is written.
     """
-    Download a Google Sheet and return its contents as a list of rows.
+
+    def __init__(self, sheet_id, sheet_gid, etag=None, last_modified=None):
+        self.sheet_id = sheet_id
+        self.sheet_gid = sheet_gid
+        self.filename = _sheet_cache_filename(sheet_id, sheet_gid)
+        self.temp_filename = atomic_file.temp_filename(self.filename)
+        self.file = None
+        self.rows = 0
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.filename)), exist_ok=True)
+            self.file = open(self.temp_filename, "w", encoding="utf-8") # pylint: disable=consider-using-with
+            self.file.write(json.dumps({"etag": etag, "last_modified": last_modified, "rows": []}, ensure_ascii=False)[:-2])
+        except Exception as e:
+            self._failed(e)
+
+    def _failed(self, e):
+        print(f"Could not cache sheet {self.sheet_id} gid {self.sheet_gid}: {e}")
+        self.discard()
+
+    def add(self, row):
+        if self.file is None:
+            return
+        try:
+            self.file.write(("," if self.rows else "") + json.dumps(row, ensure_ascii=False))
+            self.rows += 1
+        except Exception as e:
+            self._failed(e)
+
+    def commit(self):
+        if self.file is None:
+            return
+        try:
+            self.file.write("]}")
+            self.file.close()
+            self.file = None
+            os.replace(self.temp_filename, self.filename)
+        except Exception as e:
+            self._failed(e)
+
+    def discard(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if os.path.exists(self.temp_filename):
+            os.remove(self.temp_filename)
+
+def _iter_lines(response, chunk_size=64 * 1024):
+    """
+    Decode a streamed response as UTF-8 a chunk at a time and yield its lines, line
+    endings included, as csv.reader expects (quoted cells may span several lines).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        lines = (pending + decoder.decode(chunk)).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+def iter_sheet(url, use_cache=True):
+    """
+    Download a Google Sheet and yield its rows as they arrive.
+
+    Like download_sheet, but the CSV export is decoded and parsed while it streams in,
+    so the first rows can be used before the last have been received and the sheet is
+    never held in memory as a whole. The cache entry is written alongside and only
+    replaces the old one once the whole sheet has been read. Cached rows (on a 304, or
+    when Google can't be reached) and offline snapshot rows are yielded the same way.
 
     Args:
         url (str): Public URL of the Google Sheet
+        use_cache (bool): Set to False to force a full download
 
-    Returns:
-        list: A list of lists, where each inner list represents a row from the sheet
+    Yields:
+        list: Each row of the sheet, header row first
 
     Raises:
         ValueError: If the URL is not a valid Google Sheets URL
@@ -81,26 +298,150 @@ def download_sheet(url):
     # Extract the Sheet ID from the URL
     sheet_id, sheet_gid = extract_sheet_id_gid(url)
 
+    if config.OFFLINE:
+        import snapshot # pylint: disable=import-outside-toplevel
+        yield from snapshot.current().sheet_rows(sheet_id, sheet_gid)
+        return
+
     # Construct the export URL for the first sheet (as CSV)
-    export_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={sheet_gid}"
+    export_url = f"{config.SHEETS_DOCS_URL}/spreadsheets/d/{sheet_id}/export?format=csv&gid={sheet_gid}"
+
+    cached = _load_cached_sheet(sheet_id, sheet_gid) if use_cache else None
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    # Start the CSV download; the body is read as the rows are consumed
+    response = None
+    with tracing.span("GET sheet export", gid=sheet_gid, conditional=bool(headers)) as span:
+        try:
+            response = http_client.get(export_url, headers=headers, stream=True)
+            span.set(status=response.status_code)
+        except http_client.NETWORK_ERRORS as e:
+            if cached is None:
+                raise
+            print(f"Warning: cannot reach Google ({e}); using the cached copy of sheet {sheet_id} gid {sheet_gid}")
+
+    if response is None:
+        yield from cached["rows"]
+        return
+
+    with response:
+        if response.status_code == 304 and cached is not None:
+            yield from cached["rows"]
+            return
 
-    # Download the CSV content
-    response = requests.get(export_url) # pylint: disable=missing-timeout
+        # Check if the request was successful
+        if response.status_code != 200:
+            raise Exception(f"Failed to download the sheet. Status code: {response.status_code}")
 
-    # Check if the request was successful
+        writer = _SheetCacheWriter(sheet_id, sheet_gid, response.headers.get("ETag"), response.headers.get("Last-Modified")) if use_cache else None
+        try:
+            for row in csv.reader(_iter_lines(response)):
+                if writer:
+                    writer.add(row)
+                yield row
+            if writer:
+                writer.commit()
+        finally:
+            # Left unfinished (an error, or the caller stopped early): keep the old entry
+            if writer:
+                writer.discard()
+
+@tracing.traced()
+def download_sheet(url, use_cache=True):
+    """
+    Download a Google Sheet and return its contents as a list of rows.
+
+    The parsed rows are cached on disk along with the export's ETag and Last-Modified
+    validators. When a cached copy exists the export is fetched conditionally, and a
+    304 returns the cached rows without parsing anything. If Google can't be reached,
+    the cached rows are returned with a warning. In offline mode the rows come from the
+    snapshot (see snapshot.py). To use the rows as they arrive, see iter_sheet.
+
+    Args:
+        url (str): Public URL of the Google Sheet
+        use_cache (bool): Set to False to force a full download
+
+    Returns:
+        list: A list of lists, where each inner list represents a row from the sheet
+
+    Raises:
+        ValueError: If the URL is not a valid Google Sheets URL
+        Exception: If there's an error downloading the sheet
+    """
+    return list(iter_sheet(url, use_cache))
+
+def _sheet_range(tab_name):
+    """A range covering a whole tab, in A1 notation ('It''s' quoting and all)."""
+    return "'" + tab_name.replace("'", "''") + "'"
+
+def _batch_get(spreadsheet_id, tab_names, api_key):
+    """
+    Fetch tab_names with one values:batchGet request. Returns {tab name: rows}, or
+    None if the request is refused (e.g. the Sheets API isn't enabled for the key).
+    """
+    query = [("ranges", _sheet_range(tab_name)) for tab_name in tab_names]
+    query += [("majorDimension", "ROWS"), ("valueRenderOption", "FORMATTED_VALUE"), ("key", api_key)]
+    batch_url = f"{config.SHEETS_API_URL}/v4/spreadsheets/{spreadsheet_id}/values:batchGet?{urllib.parse.urlencode(query)}"
+    with tracing.span("GET values:batchGet", tabs=len(tab_names)) as span:
+        response = http_client.get(batch_url)
+        span.set(status=response.status_code, bytes=len(response.content))
     if response.status_code != 200:
-        raise Exception(f"Failed to download the sheet. Status code: {response.status_code}")
+        print(f"values:batchGet failed ({response.status_code}); downloading the tabs one by one")
+        return None
+
+    sheets = {}
+    for tab_name, value_range in zip(tab_names, response.json()["valueRanges"]):
+        rows = value_range.get("values", [])
+        # The API leaves out trailing empty cells; the CSV export pads every row to the same width
+        width = max((len(row) for row in rows), default=0)
+        sheets[tab_name] = [row + [""] * (width - len(row)) for row in rows]
+    return sheets
+
+@tracing.traced()
+def download_sheets(spreadsheet_url, tab_names, api_key=None, max_workers=4):
+    """
+    Download several tabs of a spreadsheet and return {tab name: list of rows}.
+
+    All the tabs are fetched in one round trip with the Sheets API's values:batchGet,
+    using the same API key as get_sheet_urls. If that isn't available, or Google can't
+    be reached, each tab is downloaded with download_sheet, concurrently (which also
+    falls back to cached copies when Google can't be reached).
+
+    Raises:
+        Exception: If a tab doesn't exist or can't be downloaded
+    """
+    if api_key is None:
+        from apikey import API_KEY as api_key # pylint: disable=import-outside-toplevel
 
-    # Convert the content to a string
-    csv_content = response.content.decode('utf-8')
+    spreadsheet_id = extract_spreadsheet_id(spreadsheet_url)
+    tab_names = list(dict.fromkeys(tab_names))
+    sheet_urls = get_sheet_urls(spreadsheet_url, api_key, required=tab_names)
+    missing = [tab_name for tab_name in tab_names if tab_name not in sheet_urls]
+    if missing:
+        raise Exception(f"Cannot find sheet(s) named {', '.join(repr(tab_name) for tab_name in missing)} in spreadsheet")
+    if config.OFFLINE or not tab_names:
+        return {tab_name: download_sheet(sheet_urls[tab_name]) for tab_name in tab_names}
 
-    # Parse the CSV content
-    csv_reader = csv.reader(io.StringIO(csv_content))
+    try:
+        sheets = _batch_get(spreadsheet_id, tab_names, api_key)
+    except http_client.NETWORK_ERRORS as e:
+        print(f"Warning: values:batchGet failed ({e}); downloading the tabs one by one")
+        sheets = None
 
-    # Convert to a list of rows
-    data = list(csv_reader)
+    if sheets is not None:
+        # Keep the per-tab cache current, so download_sheet can still fall back to it offline
+        for tab_name, rows in sheets.items():
+            _save_cached_sheet(spreadsheet_id, extract_sheet_id_gid(sheet_urls[tab_name])[1], rows)
+        return sheets
 
-    return data
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(tab_names))) as executor:
+        futures = {tab_name: executor.submit(download_sheet, sheet_urls[tab_name]) for tab_name in tab_names}
+        return {tab_name: future.result() for tab_name, future in futures.items()}
 
 
 # Solution: Using the Google Sheets API with an API key (no OAuth needed for public sheets)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Errors meaning the server couldn't be reached at all (after retries)
+NETWORK_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+# Errors meaning a streamed response was cut off part way through
+TRANSFER_ERRORS = NETWORK_ERRORS + (requests.exceptions.ChunkedEncodingError,)
+
+class OfflineError(Exception):
+    pass
+
+_session = None
+_session_lock = threading.Lock()
+
+def _make_session():
+    retry = Retry(
+        total=config.HTTP_RETRIES,
+        backoff_factor=config.HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry,
+                          pool_connections=config.HTTP_POOL_SIZE,
+                          pool_maxsize=config.HTTP_POOL_SIZE)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session():
+    """
+    Return the process-wide requests.Session.
+
+    Connections are kept alive and pooled, so the metadata fetch, the runlist export and
+    the PDF download share TLS connections, and GETs are retried with exponential backoff
+    on connection errors and 429/5xx responses.
+    """
+    global _session # pylint: disable=global-statement
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _make_session()
+    return _session
+
+def timeout():
+    return (config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT)
+
+def get(url, **kwargs):
+    """requests.get through the shared session, with the configured timeouts by default."""
+    if config.OFFLINE:
+        raise OfflineError(f"Offline mode: not fetching {url}")
+    kwargs.setdefault("timeout", timeout())
+    return get_session().get(url, **kwargs)
+
+def close():
+    global _session # pylint: disable=global-statement
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -7,15 +7,23 @@
 # pylint: disable=missing-function-docstring
 # pylint: disable=too-many-instance-attributes
 
+import importlib
+import threading
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
 
 import config
 import next_sunday
-import scenes
+import progress
 import validation
 
+# scenes (and with it requests, psutil and the Google modules) is imported off the
+# main thread once the window is up; see prewarm().
+
+POLL_INTERVAL_MS = 100
+PREWARM_DELAY_MS = 250
+
 class SimpleInputDialog:
     def __init__(self, master, default_url="", default_filename="output.csv"):
         self.master = master
@@ -23,7 +31,7 @@ class SimpleInputDialog:
 
         # Set window size and position it in center of screen
         window_width = 1200  # Doubled from 400 to 800; WIDTH
-        window_height = 200
+        window_height = 280  # Room for the progress display
         screen_width = master.winfo_screenwidth()
         screen_height = master.winfo_screenheight()
         center_x = int(screen_width/2 - window_width/2)
@@ -70,6 +78,25 @@ class SimpleInputDialog:
         self.filename_entry = ttk.Entry(self.form_frame, width=110, textvariable=self.filename_var)  # Doubled from 30 to 60; WIDTH
         self.filename_entry.grid(row=1, column=1, sticky=tk.W, pady=5, padx=5)
 
+        # Progress display, updated from the worker's events
+        self.progress_frame = ttk.Frame(self.main_frame)
+        self.progress_frame.pack(fill=tk.X, pady=(10, 0))
+
+        self.status_var = tk.StringVar(value="")
+        self.status_label = ttk.Label(self.progress_frame, textvariable=self.status_var, font=("Segoe UI", 10))
+        self.status_label.pack(fill=tk.X)
+
+        self.progress_bar = ttk.Progressbar(self.progress_frame, mode="determinate", maximum=1.0)
+        self.progress_bar.pack(fill=tk.X, pady=(5, 0))
+
+        self.download_var = tk.StringVar(value="")
+        self.download_label = ttk.Label(self.progress_frame, textvariable=self.download_var, font=("Segoe UI", 10))
+        self.download_label.pack(fill=tk.X)
+
+        self.reporter = None
+        self.worker = None
+        self.warnings = []
+
         # Button frame
         self.button_frame = ttk.Frame(self.main_frame)
         self.button_frame.pack(fill=tk.X, pady=(20, 0))
@@ -86,7 +113,7 @@ class SimpleInputDialog:
         self.cancel_button = ttk.Button(
             self.button_frame,
             text="Cancel",
-            command=self.master.destroy
+            command=self.cancel
         )
         self.cancel_button.pack(side=tk.RIGHT, padx=5)
 
@@ -95,8 +122,18 @@ class SimpleInputDialog:
 
         # Bind Enter key to submit
         master.bind('<Return>', lambda event: self.submit())
+        master.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        # Load the heavy modules in the background once the window has been painted
+        master.after(PREWARM_DELAY_MS, self.prewarm)
+
+    def prewarm(self):
+        threading.Thread(target=importlib.import_module, args=("scenes",), daemon=True).start()
 
     def submit(self):
+        if self.worker is not None:
+            return
+
         # Validate inputs
         url = self.url_var.get().strip()
         filename = self.filename_var.get().strip()
@@ -111,33 +148,92 @@ class SimpleInputDialog:
             self.filename_entry.focus_set()
             return
 
-        if (error := validation.can_get_sheetmap(url, filename)) is not None:
-            messagebox.showerror("Error", f"Problems with URL: {error}")
-            self.url_entry.focus_set()
-            return
-
         if (error := validation.validate_config()) is not None:
             messagebox.showerror("Error", f"Problems with URL: {error}")
             self.url_entry.focus_set()
             return
 
-        # Process the information
+        # The network checks and the generation itself run on a worker thread so the
+        # window stays responsive; poll_progress() picks up what it reports.
+        self.reporter = progress.ProgressReporter()
+        self.warnings = []
+        self.worker = threading.Thread(target=self.run_worker, args=(url, filename, self.reporter), daemon=True)
+        self.submit_button.state(["disabled"])
+        self.status_var.set("Checking spreadsheet...")
+        self.worker.start()
+        self.master.after(POLL_INTERVAL_MS, self.poll_progress)
+
+    def run_worker(self, url, filename, reporter):
         try:
-            self.process_runlist(url, filename)
-            # Show a success message
-            messagebox.showinfo(
-                "Success",
-                f"Scenelist generated in {filename}"
-            )
+            error = validation.can_get_sheetmap(url, filename)
+            if reporter.cancelled:
+                reporter.report("cancelled")
+                return
+            if error is not None:
+                reporter.report("invalid", f"Problems with URL: {error}")
+                return
+            self.process_runlist(url, filename, reporter)
+            reporter.report("done", f"Scenelist generated in {filename}")
         except Exception as e:  # pylint: disable=broad-exception-caught
-            messagebox.showerror("Error", f"Something went wrong: {e}")
-
-        # Close the dialog
-        self.master.destroy()
-
-    def process_runlist(self, url, filename):
-        scenes.generate_scenes(url, filename)
-        scenes.download_pdf(url, filename)
+            if reporter.cancelled:
+                reporter.report("cancelled")
+            else:
+                reporter.report("failed", f"Something went wrong: {e}")
+
+    def process_runlist(self, url, filename, reporter=None):
+        import scenes # pylint: disable=import-outside-toplevel
+        scenes.run_pipeline(url, filename, reporter)
+
+    def poll_progress(self):
+        for event in self.reporter.drain():
+            if event.stage in ("sheet", "scenes"):
+                self.status_var.set(event.message)
+            elif event.stage == "check":
+                # e.g. a page used by two scenes; not fatal, but worth a look before going live
+                self.warnings.append(event.message)
+                self.status_var.set(f"Warning: {event.message}")
+            elif event.stage == "download":
+                self.download_var.set(f"Slides: {event.message}")
+                if event.total:
+                    self.progress_bar["value"] = event.done / event.total
+            elif event.stage == "invalid":
+                self.finish()
+                messagebox.showerror("Error", event.message)
+                self.url_entry.focus_set()
+                return
+            elif event.stage == "done":
+                if self.warnings:
+                    messagebox.showwarning("Success, with warnings", event.message + "\n\nWarnings:\n" + "\n".join(self.warnings))
+                else:
+                    messagebox.showinfo("Success", event.message)
+                self.master.destroy()
+                return
+            elif event.stage == "failed":
+                messagebox.showerror("Error", event.message)
+                self.master.destroy()
+                return
+            elif event.stage == "cancelled":
+                self.master.destroy()
+                return
+
+        self.master.after(POLL_INTERVAL_MS, self.poll_progress)
+
+    def finish(self):
+        self.worker = None
+        self.reporter = None
+        self.submit_button.state(["!disabled"])
+        self.status_var.set("")
+        self.download_var.set("")
+        self.progress_bar["value"] = 0
+
+    def cancel(self):
+        if self.reporter is None:
+            self.master.destroy()
+            return
+        # Aborts in-flight transfers; the worker reports "cancelled" once it has stopped
+        self.status_var.set("Cancelling...")
+        self.cancel_button.state(["disabled"])
+        self.reporter.cancel()
 
 def main():
     root = tk.Tk()
@@ -39,6 +39,37 @@ def next_sunday_noon():
     # Format the date as yyyy-mm-dd
     return next_sunday_noon.strftime('%Y-%m-%d')
 
+def next_sundays(count):
+    """
+    The next `count` Sundays, starting with next_sunday_noon().
+
+    Returns:
+        list: Dates in 'yyyy-mm-dd' format.
+    """
+    first = datetime.datetime.strptime(next_sunday_noon(), '%Y-%m-%d')
+    return [(first + datetime.timedelta(weeks=week)).strftime('%Y-%m-%d') for week in range(count)]
+
+def sundays_between(start, end):
+    """
+    The Sundays from start to end, inclusive.
+
+    Args:
+        start (str): First date, in 'yyyy-mm-dd' format
+        end (str): Last date, in 'yyyy-mm-dd' format
+
+    Returns:
+        list: Dates in 'yyyy-mm-dd' format.
+    """
+    day = datetime.datetime.strptime(start, '%Y-%m-%d')
+    last = datetime.datetime.strptime(end, '%Y-%m-%d')
+    day += datetime.timedelta(days=(6 - day.weekday()) % 7)
+
+    sundays = []
+    while day <= last:
+        sundays.append(day.strftime('%Y-%m-%d'))
+        day += datetime.timedelta(weeks=1)
+    return sundays
+
 # Example usage
 if __name__ == "__main__":
     print(f"Next Sunday at noon will be on: {next_sunday_noon()}")
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+"""
+Push generated scenes into a running OBS over obs-websocket (protocol v5), instead of
+rewriting the scene collection file and restarting OBS.
+
+Each push costs at most three round trips however many scenes there are: one batch reads the
+existing scenes and inputs, one creates or updates scenes, browser inputs and scene
+items, and one applies the template's transforms to the items just created.
+"""
+
+import base64
+import hashlib
+import itertools
+import json
+
+from websockets.sync.client import connect
+
+import config
+
+SUBPROTOCOL = "obswebsocket.json"
+RPC_VERSION = 1
+
+# obs-websocket message opcodes
+OP_HELLO = 0
+OP_IDENTIFY = 1
+OP_IDENTIFIED = 2
+OP_REQUEST = 6
+OP_REQUEST_RESPONSE = 7
+OP_REQUEST_BATCH = 8
+OP_REQUEST_BATCH_RESPONSE = 9
+
+# Scene collection files store bounds types as numbers; the websocket API uses names
+BOUNDS_TYPES = ["OBS_BOUNDS_NONE", "OBS_BOUNDS_STRETCH", "OBS_BOUNDS_SCALE_INNER", "OBS_BOUNDS_SCALE_OUTER",
+                "OBS_BOUNDS_SCALE_TO_WIDTH", "OBS_BOUNDS_SCALE_TO_HEIGHT", "OBS_BOUNDS_MAX_ONLY"]
+
+class ObsWebSocketError(Exception):
+    pass
+
+def authentication_string(password, salt, challenge):
+    secret = base64.b64encode(hashlib.sha256((password + salt).encode("utf-8")).digest()).decode("ascii")
+    return base64.b64encode(hashlib.sha256((secret + challenge).encode("utf-8")).digest()).decode("ascii")
+
+class ObsWebSocket:
+    """A minimal synchronous obs-websocket v5 client."""
+
+    def __init__(self, url=None, password=None, timeout=10):
+        self.url = url or config.OBS_WEBSOCKET_URL
+        self.password = password if password is not None else config.OBS_WEBSOCKET_PASSWORD
+        self.timeout = timeout
+        self.round_trips = 0
+        self._connection = None
+        self._request_ids = itertools.count(1)
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def connect(self):
+        self._connection = connect(self.url, subprotocols=[SUBPROTOCOL], open_timeout=self.timeout,
+                                   max_size=None, proxy=None)
+        hello = self._receive(OP_HELLO)
+        identify = {"rpcVersion": RPC_VERSION, "eventSubscriptions": 0}
+        if "authentication" in hello:
+            if not self.password:
+                raise ObsWebSocketError("OBS requires a websocket password (config.OBS_WEBSOCKET_PASSWORD)")
+            auth = hello["authentication"]
+            identify["authentication"] = authentication_string(self.password, auth["salt"], auth["challenge"])
+        self._send(OP_IDENTIFY, identify)
+        self._receive(OP_IDENTIFIED)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _send(self, op, data):
+        self._connection.send(json.dumps({"op": op, "d": data}))
+
+    def _receive(self, op):
+        while True:
+            message = json.loads(self._connection.recv(timeout=self.timeout))
+            # Events and other unsolicited messages are skipped
+            if message["op"] == op:
+                return message["d"]
+
+    def request(self, request_type, request_data=None):
+        request_id = str(next(self._request_ids))
+        self._send(OP_REQUEST, {"requestType": request_type, "requestId": request_id,
+                                "requestData": request_data or {}})
+        self.round_trips += 1
+        while True:
+            response = self._receive(OP_REQUEST_RESPONSE)
+            if response["requestId"] == request_id:
+                break
+        status = response["requestStatus"]
+        if not status["result"]:
+            raise ObsWebSocketError(f"{request_type} failed ({status['code']}): {status.get('comment', '')}")
+        return response.get("responseData", {})
+
+    def batch(self, requests, halt_on_failure=False):
+        """
+        Send (request_type, request_data) pairs as one RequestBatch and return the
+        per-request results, in order, as obs-websocket reports them.
+        """
+        if not requests:
+            return []
+        request_id = str(next(self._request_ids))
+        self._send(OP_REQUEST_BATCH, {
+            "requestId": request_id,
+            "haltOnFailure": halt_on_failure,
+            "requests": [{"requestType": request_type, "requestData": request_data}
+                         for request_type, request_data in requests],
+        })
+        self.round_trips += 1
+        while True:
+            response = self._receive(OP_REQUEST_BATCH_RESPONSE)
+            if response["requestId"] == request_id:
+                return response["results"]
+
+def scene_item_transform(item):
+    """Convert a scene item from a scene collection file into a SetSceneItemTransform transform."""
+    transform = {}
+    if "pos" in item:
+        transform.update({"positionX": item["pos"]["x"], "positionY": item["pos"]["y"]})
+    if "scale" in item:
+        transform.update({"scaleX": item["scale"]["x"], "scaleY": item["scale"]["y"]})
+    if "rot" in item:
+        transform["rotation"] = item["rot"]
+    if "align" in item:
+        transform["alignment"] = item["align"]
+    if "bounds_type" in item and 0 <= item["bounds_type"] < len(BOUNDS_TYPES):
+        transform["boundsType"] = BOUNDS_TYPES[item["bounds_type"]]
+    if "bounds_align" in item:
+        transform["boundsAlignment"] = item["bounds_align"]
+    if "bounds" in item:
+        transform.update({"boundsWidth": item["bounds"]["x"], "boundsHeight": item["bounds"]["y"]})
+    for side in ("left", "top", "right", "bottom"):
+        if f"crop_{side}" in item:
+            transform[f"crop{side.capitalize()}"] = item[f"crop_{side}"]
+    return transform
+
+def _check_results(results, requests, errors):
+    for (request_type, request_data), result in zip(requests, results):
+        status = result["requestStatus"]
+        if not status["result"]:
+            errors.append(f"{request_type} {request_data.get('sceneName') or request_data.get('inputName', '')}: "
+                          f"{status.get('comment', status['code'])}")
+
+def push_scenes(new_scenes, client):
+    """
+    Create or update the given (browser, scene) pairs, as returned by generate_scene,
+    in the OBS that client is connected to.
+
+    Scenes that don't exist yet are created with the template's items and transforms;
+    for scenes that do, only the browser input's settings are updated. Returns a
+    summary string; raises ObsWebSocketError listing any requests OBS rejected.
+    """
+    state = client.batch([("GetSceneList", {}), ("GetInputList", {})], halt_on_failure=True)
+    existing_scenes = {scene["sceneName"] for scene in state[0]["responseData"]["scenes"]}
+    existing_inputs = {source["inputName"] for source in state[1]["responseData"]["inputs"]}
+
+    requests = []
+    # Index into requests of each created scene item, with the template item it came from
+    created_items = []
+    created = updated = 0
+
+    for browser, scene in new_scenes:
+        scene_name = scene["name"]
+        browser_name = browser["name"] if browser else None
+
+        if scene_name in existing_scenes:
+            updated += 1
+            if browser_name in existing_inputs:
+                requests.append(("SetInputSettings", {"inputName": browser_name, "inputSettings": browser["settings"], "overlay": True}))
+            elif browser:
+                requests.append(("CreateInput", {"sceneName": scene_name, "inputName": browser_name, "inputKind": browser["id"],
+                                                 "inputSettings": browser["settings"], "sceneItemEnabled": True}))
+            continue
+
+        created += 1
+        requests.append(("CreateScene", {"sceneName": scene_name}))
+        for item in scene["settings"]["items"]:
+            if item["name"] == browser_name and browser_name not in existing_inputs:
+                requests.append(("CreateInput", {"sceneName": scene_name, "inputName": browser_name, "inputKind": browser["id"],
+                                                 "inputSettings": browser["settings"], "sceneItemEnabled": item.get("visible", True)}))
+                existing_inputs.add(browser_name)
+            else:
+                if item["name"] == browser_name:
+                    requests.append(("SetInputSettings", {"inputName": browser_name, "inputSettings": browser["settings"], "overlay": True}))
+                requests.append(("CreateSceneItem", {"sceneName": scene_name, "sourceName": item["name"],
+                                                     "sceneItemEnabled": item.get("visible", True)}))
+            created_items.append((len(requests) - 1, scene_name, item))
+
+    errors = []
+    results = client.batch(requests)
+    _check_results(results, requests, errors)
+
+    transforms = []
+    for index, scene_name, item in created_items:
+        result = results[index]
+        if result["requestStatus"]["result"] and (transform := scene_item_transform(item)):
+            transforms.append(("SetSceneItemTransform", {"sceneName": scene_name,
+                                                         "sceneItemId": result["responseData"]["sceneItemId"],
+                                                         "sceneItemTransform": transform}))
+    _check_results(client.batch(transforms), transforms, errors)
+
+    if errors:
+        raise ObsWebSocketError("OBS rejected some requests: " + "; ".join(errors))
+    return f"{created} scenes created, {updated} updated in {client.round_trips} round trips"
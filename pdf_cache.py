@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+import apikey
+import atomic_file
+import config
+import google_drive as gd
+
+_store_lock = threading.Lock()
+_download_locks = {}  # stored filename -> lock held while it is checked for and downloaded
+
+def _download_lock(stored_filename):
+    with _store_lock:
+        return _download_locks.setdefault(stored_filename, threading.Lock())
+
+def store_directory():
+    return os.path.join(config.CACHE_DIRECTORY, "pdfs")
+
+def _last_used_filename():
+    return os.path.join(store_directory(), "last_used.json")
+
+def _load_last_used():
+    """
+    {stored deck name: last-use time}. Kept apart from the decks' mtimes, which the
+    slides files share through their hardlinks (and pdf_raster keys its page cache on).
+    """
+    try:
+        with open(_last_used_filename(), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def revision_key(metadata):
+    """
+    A filesystem-safe key for the content of a Drive file: its MD5 when Drive has one,
+    else the head revision, else modification time plus size.
+    """
+    if metadata.get("md5Checksum"):
+        key = f"md5-{metadata['md5Checksum']}"
+    elif metadata.get("headRevisionId"):
+        key = f"rev-{metadata['headRevisionId']}"
+    elif metadata.get("modifiedTime"):
+        key = f"mod-{metadata['modifiedTime']}-{metadata.get('size', '')}"
+    else:
+        return None
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+
+def _materialize(stored_filename, filename):
+    """Put the stored deck at filename, as a hardlink where possible and a copy otherwise."""
+    if os.path.exists(filename):
+        if os.path.samefile(stored_filename, filename):
+            # Already linked by an earlier run; linking again would leave a stray temp name
+            return
+        stored, current = os.stat(stored_filename), os.stat(filename)
+        if (stored.st_size, stored.st_mtime_ns) == (current.st_size, current.st_mtime_ns):
+            # Copied by an earlier run (no hardlinks here)
+            return
+    with atomic_file.replacing(filename) as temp_filename:
+        try:
+            os.link(stored_filename, temp_filename)
+        except OSError:
+            # Keep the stored mtime, so the copy looks unchanged to pdf_raster's page cache
+            shutil.copy2(stored_filename, temp_filename)
+
+def _evict(budget, keep, last_used):
+    """Delete least recently used decks until the store fits in budget bytes."""
+    entries = []
+    with os.scandir(store_directory()) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(".pdf"):
+                stat = entry.stat()
+                entries.append((last_used.get(entry.name, stat.st_mtime), stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= budget:
+            break
+        if os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        try:
+            os.remove(path)
+            total -= size
+            last_used.pop(os.path.basename(path), None)
+        except OSError as e:
+            print(f"Could not evict {path} from the PDF cache: {e}")
+
+def fetch_pdf(url, filename, budget=None, reporter=None):
+    """
+    Make filename hold the current content of the Drive file at url, downloading it only
+    if the local store doesn't already have this revision.
+
+    The store lives in CACHE_DIRECTORY/pdfs and is keyed by Drive file ID plus revision,
+    so an unchanged deck costs one metadata request. If the metadata can't be fetched
+    the deck is downloaded straight to filename.
+
+    Returns:
+    bool: True if successful, False otherwise
+    """
+    file_id = gd.extract_file_id(url)
+    if file_id is None:
+        print(f"Could not extract file ID from URL: {url}")
+        return False
+
+    try:
+        key = revision_key(gd.get_file_metadata(file_id, apikey.API_KEY))
+    except Exception as e:
+        print(f"Not using the PDF cache: {e}")
+        key = None
+    if key is None:
+        return gd.download_to_local_filesystem(url, filename, reporter=reporter)
+
+    os.makedirs(store_directory(), exist_ok=True)
+    stored_filename = os.path.join(store_directory(), f"{file_id}-{key}.pdf")
+
+    # Scenelists sharing a deck (e.g. in a batch) wait for one download instead of all
+    # writing the same .part file; the others then find it in the store
+    with _download_lock(stored_filename):
+        if os.path.exists(stored_filename):
+            print(f"Slides unchanged; using cached copy {stored_filename}")
+            if reporter:
+                reporter.report("download", "Slides unchanged since the last download")
+        elif not gd.download_to_local_filesystem(url, stored_filename, reporter=reporter):
+            return False
+
+    with _store_lock:
+        try:
+            _materialize(stored_filename, filename)
+        except OSError as e:
+            print(f"Could not put the cached slides at {filename}: {e}")
+            return False
+        last_used = _load_last_used()
+        last_used[os.path.basename(stored_filename)] = time.time()
+        _evict(config.PDF_CACHE_BUDGET if budget is None else budget, stored_filename, last_used)
+        try:
+            atomic_file.write_json(last_used, _last_used_filename())
+        except OSError as e:
+            print(f"Could not record the use of {stored_filename}: {e}")
+
+    return True
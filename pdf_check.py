@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+"""
+Check a runlist's page numbers against its slide deck before the scenes are written.
+
+page_count() reads only the end of the file (startxref and the trailer), the
+cross-reference section it points to, and the two objects that lead to the page
+count (the document catalog and the root page tree), so its cost doesn't grow with
+the size of the deck. Both classic xref tables and PDF 1.5 xref streams, including
+objects inside object streams, are understood; anything else falls back to a full
+scan.
+"""
+
+import collections
+import re
+import zlib
+
+TAIL_SIZE = 4096
+READ_SIZE = 64 * 1024
+
+class PdfError(Exception):
+    pass
+
+def _read_at(file, offset, size=READ_SIZE):
+    file.seek(offset)
+    return file.read(size)
+
+def _startxref(file):
+    file.seek(0, 2)
+    size = file.tell()
+    tail = _read_at(file, max(size - TAIL_SIZE, 0), TAIL_SIZE)
+    # The last one wins: incrementally updated files have one per revision
+    matches = re.findall(rb"startxref\s+(\d+)", tail)
+    if not matches:
+        raise PdfError("no startxref")
+    return int(matches[-1])
+
+def _dictionary_ref(data, key):
+    match = re.search(rb"/" + key + rb"\s+(\d+)\s+(\d+)\s+R", data)
+    return int(match.group(1)) if match else None
+
+def _dictionary_int(data, key):
+    match = re.search(rb"/" + key + rb"\s+(\d+)", data)
+    return int(match.group(1)) if match else None
+
+def _stream_data(file, offset, data):
+    """Decode the stream of the object read at offset (data is its first READ_SIZE bytes)."""
+    match = re.search(rb"stream\r?\n", data)
+    if not match:
+        raise PdfError("unsupported stream")
+    start = offset + match.end()
+    if _dictionary_ref(data[:match.start()], b"Length") is not None:
+        # An indirect /Length; look for endstream instead of resolving it
+        raw = _read_at(file, start)
+        while (end := raw.find(b"endstream")) < 0:
+            more = _read_at(file, start + len(raw))
+            if not more:
+                raise PdfError("unterminated stream")
+            raw += more
+        raw = raw[:end]
+    else:
+        length = _dictionary_int(data, b"Length")
+        if length is None:
+            raise PdfError("stream has no /Length")
+        raw = _read_at(file, start, length)
+    if b"/FlateDecode" in data[:match.start()]:
+        raw = zlib.decompressobj().decompress(raw)
+    elif b"/Filter" in data[:match.start()]:
+        raise PdfError("unsupported stream filter")
+    return raw
+
+def _unpredict(raw, columns):
+    """Undo PNG predictors (as used by xref streams with /Predictor >= 10)."""
+    rows = []
+    previous = bytearray(columns)
+    for start in range(0, len(raw), columns + 1):
+        kind, row = raw[start], bytearray(raw[start + 1:start + 1 + columns])
+        if kind == 2:
+            for i in range(columns):
+                row[i] = (row[i] + previous[i]) & 0xFF
+        elif kind != 0:
+            raise PdfError(f"unsupported PNG predictor {kind}")
+        rows.append(bytes(row))
+        previous = row
+    return b"".join(rows)
+
+def _read_xref_table(file, offset, entries):
+    """Read a classic xref section and return its trailer dictionary bytes."""
+    data = _read_at(file, offset, READ_SIZE)
+    position = len(b"xref")
+    while True:
+        match = re.compile(rb"\s*(\d+)\s+(\d+)\s*\r?\n").match(data, position)
+        if not match:
+            break
+        first, count = int(match.group(1)), int(match.group(2))
+        position = match.end()
+        needed = position + count * 20
+        if needed > len(data):
+            data += _read_at(file, offset + len(data), needed - len(data) + READ_SIZE)
+        for index in range(count):
+            entry = data[position + index * 20:position + index * 20 + 18]
+            number = first + index
+            if number not in entries and entry[17:18] == b"n":
+                entries[number] = ("offset", int(entry[:10]))
+        position += count * 20
+    trailer_start = data.find(b"trailer", position)
+    if trailer_start < 0:
+        raise PdfError("no trailer")
+    return data[trailer_start:]
+
+def _read_xref_stream(file, offset, entries):
+    """Read an xref stream and return its dictionary bytes (which double as the trailer)."""
+    data = _read_at(file, offset, READ_SIZE)
+    header = data[:data.find(b"stream")]
+    widths = [int(w) for w in re.search(rb"/W\s*\[\s*([\d\s]+)\]", header).group(1).split()]
+    size = _dictionary_int(header, b"Size")
+    index_match = re.search(rb"/Index\s*\[\s*([\d\s]+)\]", header)
+    index = [int(i) for i in index_match.group(1).split()] if index_match else [0, size]
+
+    raw = _stream_data(file, offset, data)
+    predictor = _dictionary_int(header, b"Predictor")
+    if predictor and predictor >= 10:
+        raw = _unpredict(raw, _dictionary_int(header, b"Columns") or 1)
+
+    if len(raw) < sum(widths) * sum(index[1::2]):
+        raise PdfError("truncated xref stream")
+    position = 0
+    for first, count in zip(index[0::2], index[1::2]):
+        for number in range(first, first + count):
+            fields = []
+            for width in widths:
+                fields.append(int.from_bytes(raw[position:position + width], "big") if width else None)
+                position += width
+            kind = 1 if fields[0] is None else fields[0]
+            if number in entries:
+                continue
+            if kind == 1:
+                entries[number] = ("offset", fields[1])
+            elif kind == 2:
+                entries[number] = ("compressed", fields[1])
+    return header
+
+def _read_xref(file):
+    """Map object numbers to their locations, newest revision first, and return the trailer."""
+    entries = {}
+    trailer = None
+    offset = _startxref(file)
+    seen = set()
+    while offset is not None and offset not in seen:
+        seen.add(offset)
+        if _read_at(file, offset, 4) == b"xref":
+            section_trailer = _read_xref_table(file, offset, entries)
+        else:
+            section_trailer = _read_xref_stream(file, offset, entries)
+        trailer = trailer or section_trailer
+        stream_offset = _dictionary_int(section_trailer, b"XRefStm")
+        if stream_offset is not None and stream_offset not in seen:
+            seen.add(stream_offset)
+            _read_xref_stream(file, stream_offset, entries)
+        offset = _dictionary_int(section_trailer, b"Prev")
+    return entries, trailer
+
+def _read_object(file, entries, number):
+    """Return the bytes of object number, up to its endobj."""
+    location = entries.get(number)
+    if location is None:
+        raise PdfError(f"object {number} is not in the xref")
+    if location[0] == "offset":
+        data = _read_at(file, location[1])
+        match = re.match(rb"\s*\d+\s+\d+\s+obj", data)
+        if not match:
+            raise PdfError(f"object {number} is not at its xref offset")
+        end = data.find(b"endobj")
+        return data[match.end():end if end >= 0 else None]
+
+    stream_number = location[1]
+    stream_location = entries.get(stream_number)
+    if stream_location is None or stream_location[0] != "offset":
+        raise PdfError(f"object stream {stream_number} is not in the xref")
+    data = _read_at(file, stream_location[1])
+    stream = _stream_data(file, stream_location[1], data)
+    count, first = _dictionary_int(data, b"N"), _dictionary_int(data, b"First")
+    header = [int(value) for value in stream[:first].split()[:count * 2]]
+    offsets = dict(zip(header[0::2], header[1::2]))
+    if number not in offsets:
+        raise PdfError(f"object {number} is not in object stream {stream_number}")
+    start = first + offsets[number]
+    later = [first + offset for offset in offsets.values() if first + offset > start]
+    return stream[start:min(later) if later else None]
+
+def _scan_page_count(file):
+    """Slow fallback: the largest /Count of any /Type /Pages dictionary in the file."""
+    file.seek(0)
+    data = file.read()
+    counts = [int(match.group(1)) for match in re.finditer(rb"/Type\s*/Pages\b[^>]*?/Count\s+(\d+)", data)]
+    counts += [int(match.group(1)) for match in re.finditer(rb"/Count\s+(\d+)[^>]*?/Type\s*/Pages\b", data)]
+    if not counts:
+        raise PdfError("cannot find the page count")
+    return max(counts)
+
+def page_count(pdf_filename):
+    """The number of pages in pdf_filename, read from its xref and trailer."""
+    with open(pdf_filename, "rb") as file:
+        try:
+            entries, trailer = _read_xref(file)
+            catalog = _read_object(file, entries, _dictionary_ref(trailer, b"Root"))
+            pages = _read_object(file, entries, _dictionary_ref(catalog, b"Pages"))
+            count = _dictionary_int(pages, b"Count")
+            if count is None:
+                raise PdfError("the page tree has no /Count")
+            return count
+        except (PdfError, ValueError, TypeError, AttributeError, zlib.error) as e:
+            print(f"Reading the page count of {pdf_filename} the slow way: {e}")
+            return _scan_page_count(file)
+
+def page_number(text):
+    """The page number in a runlist page cell ("3", " 03"), or None if it isn't one."""
+    text = text.strip()
+    return int(text) if text.isascii() and text.isdigit() else None
+
+def check_pages(runlist, pages, uses_page=None):
+    """
+    Check the page numbers in a runlist (header row first) against a deck of pages pages.
+    If uses_page is given, only the rows it returns True for are checked; the others
+    (e.g. rows whose template shows no slide) may have anything in the page column.
+
+    Returns:
+        tuple: (errors, warnings) - lists of messages for out-of-range pages and for
+        pages used by more than one row
+    """
+    errors = []
+    rows_by_page = collections.defaultdict(list)
+    for row in runlist[1:]:
+        if len(row) < 3 or not row[2].strip():
+            continue
+        if uses_page is not None and not uses_page(row):
+            continue
+        page = page_number(row[2])
+        if page is None:
+            errors.append(f"'{row[0]}' has page '{row[2].strip()}', which is not a number")
+            continue
+        rows_by_page[page].append(row[0])
+        if not 1 <= page <= pages:
+            errors.append(f"'{row[0]}' uses page {page}, but the slides have {pages} pages")
+
+    warnings = [f"page {page} is used by {', '.join(repr(name) for name in names)}"
+                for page, names in sorted(rows_by_page.items()) if len(names) > 1]
+    return errors, warnings
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+"""
+Render the slide pages a runlist uses to PNG files, so scenes can show them with
+lightweight image sources instead of a browser source running a PDF viewer.
+
+Rendering uses PyMuPDF (pip install pymupdf). Pages are rendered in parallel across
+CPU cores and cached in CACHE_DIRECTORY/pages by PDF content hash, page and
+resolution, so rerunning with the same deck costs only a hash check.
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import threading
+
+import atomic_file
+import config
+import pdf_check
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def _open_pdf(pdf_filename):
+    try:
+        import pymupdf # pylint: disable=import-outside-toplevel
+    except ImportError:
+        import fitz as pymupdf # pylint: disable=import-outside-toplevel
+    return pymupdf.open(pdf_filename)
+
+def referenced_pages(runlist):
+    """The distinct page numbers used by a runlist (header row first), as ints."""
+    pages = set()
+    for row in runlist[1:]:
+        if len(row) > 2 and (page := pdf_check.page_number(row[2])) is not None:
+            pages.add(page)
+    return sorted(pages)
+
+def canvas_size(catalog):
+    """The size to render at: that of the browser source template, which fills the canvas."""
+    settings = catalog.browser_template().get("settings", {})
+    return settings.get("width", 1920), settings.get("height", 1080)
+
+# hashes.json is read, updated and rewritten by whichever batch worker renders next
+_hashes_lock = threading.Lock()
+
+def _load_hashes(hashes_filename):
+    try:
+        with open(hashes_filename, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def pdf_hash(pdf_filename):
+    """
+    SHA-256 of the PDF, remembered in CACHE_DIRECTORY/pages/hashes.json by path, size
+    and mtime so an unchanged file isn't read again.
+    """
+    stat = os.stat(pdf_filename)
+    key = f"{os.path.abspath(pdf_filename)}|{stat.st_size}|{stat.st_mtime_ns}"
+    hashes_filename = os.path.join(config.CACHE_DIRECTORY, "pages", "hashes.json")
+    with _hashes_lock:
+        hashes = _load_hashes(hashes_filename)
+    if key in hashes:
+        return hashes[key]
+
+    digest = hashlib.sha256()
+    with open(pdf_filename, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+
+    # Re-read under the lock so hashes recorded meanwhile by other threads are kept
+    with _hashes_lock:
+        hashes = _load_hashes(hashes_filename)
+        hashes = {k: v for k, v in hashes.items() if not k.startswith(f"{os.path.abspath(pdf_filename)}|")}
+        hashes[key] = digest.hexdigest()
+        atomic_file.write_json(hashes, hashes_filename)
+    return hashes[key]
+
+def _render(pdf_filename, jobs, width, height):
+    """Render (page, image filename) jobs from one PDF; runs in a worker process."""
+    document = _open_pdf(pdf_filename)
+    try:
+        for page, image_filename in jobs:
+            pdf_page = document[page - 1]
+            zoom = min(width / pdf_page.rect.width, height / pdf_page.rect.height)
+            pixmap = pdf_page.get_pixmap(matrix=(zoom, 0, 0, zoom, 0, 0), alpha=False)
+            with atomic_file.replacing(image_filename, suffix=".tmp.png") as temp_filename:
+                pixmap.save(temp_filename)
+    finally:
+        document.close()
+
+def render_pages(pdf_filename, pages, width, height, workers=None):
+    """
+    Render the given 1-based pages of pdf_filename to PNGs that fit width x height.
+
+    Returns:
+        dict: page number (int, see pdf_check.page_number) -> absolute image filename
+    """
+    output_directory = os.path.join(config.CACHE_DIRECTORY, "pages", pdf_hash(pdf_filename))
+    os.makedirs(output_directory, exist_ok=True)
+
+    images = {}
+    jobs = []
+    for page in pages:
+        image_filename = os.path.abspath(os.path.join(output_directory, f"{page}-{width}x{height}.png"))
+        images[page] = image_filename
+        if not os.path.exists(image_filename):
+            jobs.append((page, image_filename))
+
+    if not jobs:
+        return images
+
+    page_count = pdf_check.page_count(pdf_filename)
+    bad_pages = [page for page, _ in jobs if not 1 <= page <= page_count]
+    if bad_pages:
+        raise Exception(f"{pdf_filename} has {page_count} pages; the runlist uses page(s) {', '.join(map(str, bad_pages))}")
+
+    workers = min(workers or config.RASTER_WORKERS or os.cpu_count() or 1, len(jobs))
+    if workers == 1:
+        _render(pdf_filename, jobs, width, height)
+        return images
+
+    # Every worker opens the document once and renders an interleaved share of the pages
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_render, pdf_filename, jobs[worker::workers], width, height)
+                   for worker in range(workers)]
+        for future in futures:
+            future.result()
+    return images
@@ -9,6 +9,19 @@
 
 import psutil
 
+import tracing
+
+# Executable names (without .exe) that mean OBS is running
+OBS_PROGRAM_NAMES = ("obs64",)
+
+# PID of OBS when we last found it, so later checks can verify it instead of scanning
+_obs_pid = None
+
+def _program_name(process_name):
+    if process_name.endswith('.exe'):
+        return process_name[:-4]
+    return process_name
+
 def get_running_programs():
     """
     Returns a list of names of currently running programs on Windows 11.
@@ -16,20 +29,17 @@ def get_running_programs():
     Returns:
         list: A list of program names (without file extensions)
     """
-    running_programs = []
+    running_programs = set()
 
     try:
         # Get all running processes
         for process in psutil.process_iter(['pid', 'name']):
             try:
                 # Get process name and remove .exe extension if present
-                process_name = process.info['name']
-                if process_name.endswith('.exe'):
-                    process_name = process_name[:-4]
+                process_name = _program_name(process.info['name'])
 
-                # Add to list if not already present (avoid duplicates)
-                if process_name not in running_programs:
-                    running_programs.append(process_name)
+                # The set takes care of duplicates
+                running_programs.add(process_name)
 
             except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
                 # Skip processes that can't be accessed
@@ -71,9 +81,41 @@ def get_running_programs_detailed():
     # Sort by memory usage (highest first)
     return sorted(running_programs, key=lambda x: x['memory_mb'], reverse=True)
 
+def _is_obs_pid(pid):
+    try:
+        return psutil.pid_exists(pid) and _program_name(psutil.Process(pid).name()) in OBS_PROGRAM_NAMES
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return False
+
+def find_obs_pid():
+    """
+    Returns the PID of a running OBS, or None.
+
+    The PID found last time is checked first with a single pid_exists/name lookup;
+    otherwise processes are scanned by name only until the first match.
+    """
+    global _obs_pid # pylint: disable=global-statement
+
+    if _obs_pid is not None:
+        if _is_obs_pid(_obs_pid):
+            return _obs_pid
+        _obs_pid = None
+
+    for process in psutil.process_iter(['name']):
+        process_name = process.info['name']
+        if process_name and _program_name(process_name) in OBS_PROGRAM_NAMES:
+            _obs_pid = process.pid
+            return _obs_pid
+
+    return None
+
+@tracing.traced()
 def obs_is_running():
-    process_list = get_running_programs()
-    return "obs64" in process_list
+    try:
+        return find_obs_pid() is not None
+    except Exception as e:
+        print(f"Error looking for OBS: {e}")
+        return False
 
 # Example usage
 if __name__ == "__main__":
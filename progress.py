@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+import collections
+import queue
+import threading
+
+ProgressEvent = collections.namedtuple("ProgressEvent", ["stage", "message", "done", "total"])
+
+class Cancelled(Exception):
+    pass
+
+class ProgressReporter:
+    """
+    Carries progress events from worker threads to whoever is watching (e.g. the Tk
+    dialog, which polls events), and a cancel flag back the other way.
+
+    Cancelling also closes any in-flight HTTP responses registered with track(), so a
+    worker blocked reading from the network is interrupted rather than left to finish.
+    """
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self._cancelled = threading.Event()
+        self._responses = set()
+        self._lock = threading.Lock()
+
+    def report(self, stage, message="", done=None, total=None):
+        self.events.put(ProgressEvent(stage, message, done, total))
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._lock:
+            responses = list(self._responses)
+        for response in responses:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self):
+        """Raise Cancelled if cancel() has been called."""
+        if self._cancelled.is_set():
+            raise Cancelled("Cancelled")
+
+    def track(self, response):
+        with self._lock:
+            self._responses.add(response)
+        if self.cancelled:
+            response.close()
+            self.check()
+
+    def untrack(self, response):
+        with self._lock:
+            self._responses.discard(response)
+
+    def drain(self):
+        """Return the events reported since the last drain, without blocking."""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
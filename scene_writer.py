@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+import json
+import os
+
+import atomic_file
+
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+def _encode(value, indent, depth):
+    """Encode one value as it would appear nested `depth` levels deep in json.dump output."""
+    if indent is None:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    text = json.dumps(value, ensure_ascii=False, indent=indent)
+    # JSON strings never contain a raw newline, so every newline is a line break.
+    return text.replace("\n", "\n" + " " * (indent * depth))
+
+def _write_array(file, items, indent):
+    """Write a top-level member's array one element at a time."""
+    iterator = iter(items)
+    try:
+        first = next(iterator)
+    except StopIteration:
+        file.write("[]")
+        return
+
+    if indent is None:
+        file.write("[")
+        file.write(_encode(first, None, 2))
+        for item in iterator:
+            file.write(",")
+            file.write(_encode(item, None, 2))
+        file.write("]")
+        return
+
+    item_prefix = "\n" + " " * (indent * 2)
+    file.write("[")
+    file.write(item_prefix)
+    file.write(_encode(first, indent, 2))
+    for item in iterator:
+        file.write(",")
+        file.write(item_prefix)
+        file.write(_encode(item, indent, 2))
+    file.write("\n" + " " * indent + "]")
+
+def _write_collection(file, collection, indent):
+    if not collection:
+        file.write("{}")
+        return
+
+    if indent is None:
+        member_prefix, key_separator, close = "", ":", "}"
+    else:
+        member_prefix, key_separator, close = "\n" + " " * indent, ": ", "\n}"
+
+    file.write("{")
+    for index, (key, value) in enumerate(collection.items()):
+        if index:
+            file.write(",")
+        file.write(member_prefix)
+        file.write(json.dumps(key, ensure_ascii=False))
+        file.write(key_separator)
+        if isinstance(value, (dict, str, int, float, bool)) or value is None:
+            file.write(_encode(value, indent, 1))
+        else:
+            # Lists and generators (e.g. 'scene_order' and 'sources') are streamed.
+            _write_array(file, value, indent)
+    file.write(close)
+
+def write_scene_collection(collection, filename, indent=4):
+    """
+    Write an OBS scene collection to filename, crash-safely.
+
+    The collection is streamed to a temporary file in the same directory, one top-level
+    member at a time and one array entry at a time, so list-valued members such as
+    'scene_order' and 'sources' may be given as generators. The temporary file is
+    fsynced and then renamed over filename, so OBS never sees a truncated file.
+
+    With indent=4 the output is identical to json.dump(collection, file, indent=4,
+    ensure_ascii=False); indent=None writes compact JSON, which is smaller and faster
+    to encode.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    with atomic_file.open_replacing(filename, fsync=True, buffering=WRITE_BUFFER_SIZE) as file:
+        _write_collection(file, collection, indent)
+
+    _fsync_directory(directory)
+
+def _fsync_directory(directory):
+    """Make the rename durable where the platform allows opening directories (not Windows)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
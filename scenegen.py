@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+"""
+Generate OBS scenes without the dialog, for one or many scenelists at once.
+
+Examples:
+    scenegen.py 2026-10-18
+    scenegen.py --next-sundays 6
+    scenegen.py --offline 2026-10-18
+    scenegen.py --from 2026-11-01 --to 2026-12-31 --url https://docs.google.com/spreadsheets/d/...
+"""
+
+import argparse
+import sys
+
+import config
+import google_sheets as gs
+import next_sunday
+import scenes
+import validation
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Generate OBS scene collections from the runlist spreadsheet.")
+    parser.add_argument("scenelists", nargs="*", metavar="SCENELIST",
+                        help="scenelist (tab) names, e.g. 2026-10-18")
+    parser.add_argument("--url", default=config.SCENES_URL,
+                        help="spreadsheet URL (default: config.SCENES_URL)")
+    parser.add_argument("--next-sundays", type=int, metavar="N",
+                        help="also generate the next N Sundays")
+    parser.add_argument("--from", dest="start", metavar="YYYY-MM-DD",
+                        help="also generate every Sunday from this date...")
+    parser.add_argument("--to", dest="end", metavar="YYYY-MM-DD",
+                        help="...up to and including this date")
+    parser.add_argument("--incremental", action="store_true", default=None,
+                        help="only patch scenes whose runlist rows changed (default: config.INCREMENTAL_REGENERATION)")
+    parser.add_argument("--offline", action="store_true",
+                        help="use the snapshot taken with snapshot.py instead of Google (default: config.OFFLINE)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="re-fetch the spreadsheet's list of tabs instead of using the cached one")
+    parser.add_argument("--jobs", type=int, default=4,
+                        help="scenelists to process in parallel (default: 4)")
+    args = parser.parse_args(argv)
+
+    if (args.start is None) != (args.end is None):
+        parser.error("--from and --to must be given together")
+    return args
+
+def scenelist_names(args):
+    names = list(args.scenelists)
+    if args.next_sundays:
+        names.extend(next_sunday.next_sundays(args.next_sundays))
+    if args.start:
+        names.extend(next_sunday.sundays_between(args.start, args.end))
+    if not names:
+        names.append(next_sunday.next_sunday_noon())
+    # Drop duplicates but keep the order they were asked for in
+    return list(dict.fromkeys(names))
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if args.offline:
+        config.OFFLINE = True
+
+    if (error := validation.validate_config()) is not None:
+        print(f"Configuration problem: {error}")
+        return 2
+
+    names = scenelist_names(args)
+    if args.refresh:
+        gs.invalidate_sheet_urls(args.url)
+    results = scenes.run_batch(args.url, names, max_workers=args.jobs, incremental=args.incremental)
+
+    failures = {name: error for name, error in results.items() if error is not None}
+    for name, error in results.items():
+        print(f"{name}: {'FAILED - ' + str(error) if error else 'ok'}")
+    print(f"{len(results) - len(failures)} of {len(results)} scenelists generated")
+
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
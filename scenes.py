@@ -7,116 +7,756 @@
 # pylint: disable=missing-function-docstring
 # pylint: disable=too-many-instance-attributes
 
+import concurrent.futures
 import copy
 import json
 import os
 import uuid
 
 import apikey
+import atomic_file
 import config
-import google_drive as gd
 import google_sheets as gs
+import pdf_cache
+import pdf_check
 import process_util
+import scene_writer
+import template_cache
+import tracing
 
 
-def generate_scene(scene_name, template_name, pagenum, templates, pdf_url):
+class SceneSkeleton:
+    """
+    A scene template compiled once for stamping out runlist rows.
+
+    Only the fields that change per row are copied: the scene's name and uuid and, when
+    the template has one, its browser item's name and source_uuid. Everything else is
+    shared with a private copy of the template taken at compile time.
+    """
+
+    def __init__(self, template, browser_item_index):
+        self.template = copy.deepcopy(template)
+        self.browser_item_index = browser_item_index
+
+    @property
+    def has_browser(self):
+        return self.browser_item_index is not None
+
+    def stamp(self, scene_name, scene_uuid, browser=None):
+        scene = dict(self.template)
+        scene.update({"name": scene_name,
+                      "uuid": scene_uuid})
+        if browser is not None:
+            settings = dict(scene["settings"])
+            items = list(settings["items"])
+            item = dict(items[self.browser_item_index])
+            item.update({"name": browser["name"],
+                         "source_uuid": browser["uuid"]})
+            items[self.browser_item_index] = item
+            settings["items"] = items
+            scene["settings"] = settings
+        return scene
+
+
+class BrowserSkeleton:
+    """
+    The browser source template compiled once; stamp() copies only the top level and
+    the settings dict, which hold the name, uuid, url and restart_when_active.
+    """
+
+    def __init__(self, template):
+        self.template = copy.deepcopy(template)
+
+    def stamp(self, name, source_uuid, url, restart_when_active=False):
+        b = dict(self.template)
+        b.update({"name": name,
+                  "uuid": source_uuid})
+        settings = dict(b["settings"])
+        settings["url"] = url
+        if restart_when_active:
+            settings["restart_when_active"] = True
+        b["settings"] = settings
+        return b
+
+
+class ImageSkeleton:
+    """
+    An image source for pre-rendered slides, compiled once from the templates' image
+    source, or from the browser source (given the image_source id) if there is none.
+    """
+
+    def __init__(self, template, from_browser=False):
+        self.template = copy.deepcopy(template)
+        if from_browser:
+            self.template.update({"id": "image_source", "versioned_id": "image_source", "settings": {}})
+
+    def stamp(self, name, source_uuid, image_filename):
+        i = dict(self.template)
+        i.update({"name": name,
+                  "uuid": source_uuid})
+        settings = dict(i["settings"])
+        settings["file"] = image_filename
+        i["settings"] = settings
+        return i
+
+
+class TemplateCatalog:
+    """
+    Index over a loaded templates.json, built once per run.
+
+    Scene templates are indexed by name and source templates by id, and the position
+    of each scene template's browser item is computed up front, so generating a runlist
+    row never has to scan templates["sources"].
+    """
+
+    def __init__(self, templates):
+        self.templates = templates
+        self.scenes = {}
+        self.sources_by_id = {}
+        self.browser_item_index = {}
+        self._scene_skeletons = {}
+        self._browser_skeleton = None
+        self._image_skeleton = None
 
-    def create_custom_browser():
-        name = f"Browser{scene_name}"
         for source in templates["sources"]:
-            if source["id"] == "browser_source":
-                b = copy.deepcopy(source)
-                b.update({"name": name,
-                          "uuid": str(uuid.uuid4())})
-                b["settings"]["url"] = f"{pdf_url}&page={pagenum}"
-                if name.endswith("->"):
-                    b["settings"]["restart_when_active"] = True
-
-                return b
-        raise Exception("Could not find a browser object")
-
-    def find_scene_browser(scene):
-        for item in scene["settings"]["items"]:
+            # First match wins, as it did with the linear scans.
+            self.sources_by_id.setdefault(source["id"], source)
+            if source["id"] == "scene" and source["name"] not in self.scenes:
+                self.scenes[source["name"]] = source
+                self.browser_item_index[source["name"]] = self._find_browser_item_index(source)
+
+    @staticmethod
+    def _find_browser_item_index(scene):
+        for index, item in enumerate(scene["settings"]["items"]):
             if item["name"].startswith("Browser"):
-                return item
+                return index
         return None
 
-    def update_scene_browser(scene_browser_item, browser):
-        scene_browser_item.update({"name": browser["name"],
-                                   "source_uuid": browser["uuid"]})
+    def scene_template(self, template_name):
+        try:
+            return self.scenes[template_name]
+        except KeyError:
+            known = ", ".join(sorted(self.scenes)) or "none"
+            raise Exception(f"Could not find scene template {template_name} (known templates: {known})") from None
+
+    def source_template(self, source_id):
+        try:
+            return self.sources_by_id[source_id]
+        except KeyError:
+            raise Exception(f"Could not find a source template with id {source_id}") from None
+
+    def browser_template(self):
+        if "browser_source" not in self.sources_by_id:
+            raise Exception("Could not find a browser object")
+        return self.sources_by_id["browser_source"]
+
+    def scene_skeleton(self, template_name):
+        skeleton = self._scene_skeletons.get(template_name)
+        if skeleton is None:
+            skeleton = SceneSkeleton(self.scene_template(template_name), self.browser_item_index[template_name])
+            self._scene_skeletons[template_name] = skeleton
+        return skeleton
+
+    def browser_skeleton(self):
+        if self._browser_skeleton is None:
+            self._browser_skeleton = BrowserSkeleton(self.browser_template())
+        return self._browser_skeleton
+
+    def image_skeleton(self):
+        if self._image_skeleton is None:
+            if "image_source" in self.sources_by_id:
+                self._image_skeleton = ImageSkeleton(self.sources_by_id["image_source"])
+            else:
+                self._image_skeleton = ImageSkeleton(self.browser_template(), from_browser=True)
+        return self._image_skeleton
+
+
+def generate_scene(scene_name, template_name, pagenum, catalog, pdf_url, scene_uuid=None, browser_uuid=None, page_images=None):
+
+    if not isinstance(catalog, TemplateCatalog):
+        catalog = TemplateCatalog(catalog)
+
+    skeleton = catalog.scene_skeleton(template_name)
+    scene_uuid = scene_uuid or str(uuid.uuid4())
 
-    def create_scene_from_template(scene_name, template_name):
-        for source in templates["sources"]:
-            if source["id"] == "scene" and source["name"] == template_name:
-                s = copy.deepcopy(source)
-                s.update({"name": scene_name,
-                          "uuid": str(uuid.uuid4())})
-                return s
-        raise Exception(f"Could not find scene template {template_name}")
-
-    # print("Processing:", name, template, page)
-    scene = create_scene_from_template(scene_name, template_name)
     b = None
-    scene_browser_item = find_scene_browser(scene)
-    if scene_browser_item:
-        b = create_custom_browser()
-        update_scene_browser(scene_browser_item, b)
+    page_image = page_images.get(pdf_check.page_number(pagenum)) if page_images is not None else None
+    if skeleton.has_browser and page_image is not None:
+        # The slide was pre-rendered (see pdf_raster); show it with an image source
+        b = catalog.image_skeleton().stamp(f"Slide{scene_name}", browser_uuid or str(uuid.uuid4()), page_image)
+    elif skeleton.has_browser:
+        name = f"Browser{scene_name}"
+        b = catalog.browser_skeleton().stamp(name, browser_uuid or str(uuid.uuid4()),
+                                             f"{pdf_url}&page={pagenum}",
+                                             restart_when_active=name.endswith("->"))
 
+    scene = skeleton.stamp(scene_name, scene_uuid, b)
     return b, scene
 
-def _generate_scenes(runlist, templates, scenelist_name, pdf_url):
+def _generate_rows(runlist, make_scene, reporter=None):
+    # runlist may be a list or rows still streaming in (gs.iter_sheet), so it's only iterated once
+    rows = iter(runlist)
+    next(rows, None)  # the header row
+    if reporter is None:
+        return [make_scene(scene_spec) for scene_spec in rows]
+
+    new_scenes = []
+    total = len(runlist) - 1 if isinstance(runlist, list) else None
+    for scene_spec in rows:
+        reporter.check()
+        new_scenes.append(make_scene(scene_spec))
+        done = f"{len(new_scenes)}/{total}" if total is not None else f"{len(new_scenes)}"
+        reporter.report("scenes", f"{done} scenes generated", done=len(new_scenes), total=total)
+    return new_scenes
+
+class RegenerationStats:
+    def __init__(self):
+        self.added = 0
+        self.patched = 0
+        self.unchanged = 0
+        self.removed = 0
+
+    def __str__(self):
+        return f"{self.added} added, {self.patched} patched, {self.unchanged} unchanged, {self.removed} removed"
+
+class SharedBrowser:
+    """
+    One browser source shared by every scene whose template is in shared mode
+    (config.SHARED_BROWSER_TEMPLATES), instead of a browser source per scene.
+
+    The page is switched when a scene is activated, by the OBS script that script()
+    generates from the pages recorded here.
+    """
+
+    NAME = "BrowserSharedSlides"
+
+    def __init__(self, catalog, pdf_url, templates_in_shared_mode, source_uuid=None):
+        self.catalog = catalog
+        self.pdf_url = pdf_url
+        self.templates_in_shared_mode = set(templates_in_shared_mode)
+        self.uuid = source_uuid or str(uuid.uuid4())
+        self.source = None
+        self.pages = {}  # scene name -> (page, restart when active)
+
+    def applies(self, template_name):
+        return template_name in self.templates_in_shared_mode and self.catalog.scene_skeleton(template_name).has_browser
+
+    def generate_scene(self, scene_name, template_name, pagenum, scene_uuid=None):
+        """Like generate_scene(), but the browser is only returned for the first scene that uses it."""
+        skeleton = self.catalog.scene_skeleton(template_name)
+        scene_uuid = scene_uuid or str(uuid.uuid4())
+
+        first = self.source is None
+        if first:
+            self.source = self.catalog.browser_skeleton().stamp(self.NAME, self.uuid, f"{self.pdf_url}&page={pagenum}")
+        self.pages[scene_name] = (pagenum, scene_name.endswith("->"))
+
+        return (self.source if first else None), skeleton.stamp(scene_name, scene_uuid, self.source)
+
+    def report(self):
+        count = len(self.pages)
+        return f"{count} scenes share one browser source ({max(count - 1, 0)} browser sources saved)"
+
+    def script(self):
+        """A Lua script for OBS that points the shared browser at each scene's page when it goes live."""
+        pages = "\n".join(f"    [{_lua_string(name)}] = {{page = {_lua_string(str(page))}, restart = {'true' if restart else 'false'}}},"
+                          for name, (page, restart) in self.pages.items())
+        return SHARED_BROWSER_SCRIPT.format(source_name=_lua_string(self.NAME), pdf_url=_lua_string(self.pdf_url), pages=pages)
+
+def _lua_string(value):
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+    return f'"{escaped}"'
+
+SHARED_BROWSER_SCRIPT = """-- Generated by scenegen: switches the shared slides browser source to the
+-- page of each scene as it goes live. Regenerated with the scene collection.
+obs = obslua
+
+local SOURCE_NAME = {source_name}
+local PDF_URL = {pdf_url}
+local PAGES = {{
+{pages}
+}}
+
+local function refresh(source)
+    local properties = obs.obs_source_properties(source)
+    local button = obs.obs_properties_get(properties, "refreshnocache")
+    if button ~= nil then
+        obs.obs_property_button_clicked(button, source)
+    end
+    obs.obs_properties_destroy(properties)
+end
+
+local function on_event(event)
+    if event ~= obs.OBS_FRONTEND_EVENT_SCENE_CHANGED then
+        return
+    end
+
+    local scene = obs.obs_frontend_get_current_scene()
+    local entry = PAGES[obs.obs_source_get_name(scene)]
+    obs.obs_source_release(scene)
+    if entry == nil then
+        return
+    end
+
+    local source = obs.obs_get_source_by_name(SOURCE_NAME)
+    if source == nil then
+        return
+    end
+    local url = PDF_URL .. "&page=" .. entry.page
+    local settings = obs.obs_source_get_settings(source)
+    if obs.obs_data_get_string(settings, "url") ~= url then
+        obs.obs_data_set_string(settings, "url", url)
+        obs.obs_source_update(source, settings)
+    elseif entry.restart then
+        refresh(source)
+    end
+    obs.obs_data_release(settings)
+    obs.obs_source_release(source)
+end
+
+function script_description()
+    return "Switches the shared slides browser source to each scene's page."
+end
+
+function script_load(settings)
+    obs.obs_frontend_add_event_callback(on_event)
+end
+"""
+
+def _regenerate_scene(scene_spec, generate, existing_sources, stats, claimed):
+    """
+    Generate one runlist row against the scenes already in an earlier collection.
+
+    A row whose scene is already there keeps its scene and browser UUIDs. If the result
+    is identical to what is there, the existing objects are reused as-is. claimed holds
+    the scene names whose UUIDs earlier rows took over; a repeated name gets new ones,
+    so no two scenes share a UUID.
+    """
+    scene_name = scene_spec[0]
+    old_scene = existing_sources.get(("scene", scene_name))
+    old_browser = existing_sources.get(("browser_source", f"Browser{scene_name}"))
+    if old_scene is None or scene_name in claimed:
+        stats.added += 1
+        return generate(scene_spec)
+    claimed.add(scene_name)
+
+    old_slide = old_browser or existing_sources.get(("image_source", f"Slide{scene_name}"))
+    b, scene = generate(scene_spec, scene_uuid=old_scene.get("uuid"),
+                        browser_uuid=old_slide.get("uuid") if old_slide else None)
+    if b is not None and (b["id"], b["name"]) != ("browser_source", f"Browser{scene_name}"):
+        old_browser = existing_sources.get((b["id"], b["name"]))
+    if scene == old_scene and b == old_browser:
+        stats.unchanged += 1
+        return old_browser, old_scene
+    stats.patched += 1
+    return b, scene
+
+def _generate_scenes(runlist, templates, scenelist_name, pdf_url, reporter=None, existing=None, stats=None, shared_browser=None, page_images=None):
+    """
+    Build the scene collection for runlist from templates. runlist can be any iterable
+    of rows, header first; it is read once, so scenes are built as the rows stream in.
+
+    If existing is a collection generated earlier for this scenelist, scenes for rows
+    that are still in the runlist keep their UUIDs (and their objects, when nothing
+    about them changed), so OBS sees only what the edit touched; stats, if given,
+    is a RegenerationStats that gets the counts.
+
+    If shared_browser is a SharedBrowser, rows whose template is in shared mode use
+    its browser source instead of getting their own. If page_images maps page numbers
+    to pre-rendered slide images, rows on those pages get an image source instead.
+    """
+
+    catalog = templates if isinstance(templates, TemplateCatalog) else TemplateCatalog(templates)
+
+    existing_sources = {}
+    claimed = set()
+    if existing is not None:
+        stats = stats if stats is not None else RegenerationStats()
+        existing_sources = {(source.get("id"), source.get("name")): source for source in existing.get("sources", [])}
+
+    def generate(scene_spec, scene_uuid=None, browser_uuid=None):
+        if shared_browser is not None and shared_browser.applies(scene_spec[1]):
+            return shared_browser.generate_scene(*scene_spec, scene_uuid=scene_uuid)
+        return generate_scene(*scene_spec, catalog, pdf_url, scene_uuid, browser_uuid, page_images)
 
-    new_scenes = [generate_scene(*scene_spec, templates, pdf_url) for scene_spec in runlist[1:]]
+    def make_scene(scene_spec):
+        if existing is None:
+            return generate(scene_spec)
+        return _regenerate_scene(scene_spec, generate, existing_sources, stats, claimed)
+
+    new_scenes = _generate_rows(runlist, make_scene, reporter)
+
+    if existing is not None:
+        kept = {scene["name"] for _, scene in new_scenes}
+        stats.removed = sum(1 for entry in existing.get("scene_order", [])
+                            if entry["name"] not in kept and entry["name"] not in catalog.scenes)
+
+    # Build on a copy of the top level so the templates can be reused for other scenelists
+    scenes = dict(catalog.templates)
+    scenes["scene_order"] = list(scenes["scene_order"])
+    scenes["sources"] = list(scenes["sources"])
 
     # Attempt to set the current scene
-    templates["current_scene"] = new_scenes[0][1]
-    templates["current_program_scene"] = new_scenes[0][1]
+    scenes["current_scene"] = new_scenes[0][1]
+    scenes["current_program_scene"] = new_scenes[0][1]
 
     # Each new scene must be added to 'scene_order' and appended to 'sources'
     for scene_browser, scene in new_scenes:
-        templates["scene_order"].append({"name": scene["name"]})
-        templates["sources"].append(scene)
+        scenes["scene_order"].append({"name": scene["name"]})
+        scenes["sources"].append(scene)
         if scene_browser:
-            templates["sources"].append(scene_browser)
+            scenes["sources"].append(scene_browser)
+
+    scenes["name"] = scenelist_name
+    return scenes
 
-    templates["name"] = scenelist_name
+@tracing.traced()
+def fetch_runlist(url, scenelist_name, reporter=None, stream=False):
+    """
+    The runlist rows for scenelist_name, header first. With stream=True they are
+    returned as an iterator that downloads and parses them as it is consumed.
+    """
+    if reporter:
+        reporter.report("sheet", f"Fetching runlist {scenelist_name}")
+    scenes_map = gs.get_sheet_urls(url, apikey.API_KEY, required=[scenelist_name])
+    if scenelist_name not in scenes_map:
+        raise Exception(f"Cannot find sheet named '{scenelist_name}' in spreadsheet")
+    runlist_url = scenes_map[scenelist_name]
+    if stream:
+        return gs.iter_sheet(runlist_url)
+    runlist_data = gs.download_sheet(runlist_url)
+    if reporter:
+        reporter.report("sheet", f"Fetched runlist {scenelist_name} ({len(runlist_data) - 1} rows)")
+    return runlist_data
+
+def load_templates():
+    fname = f"{config.OBS_SCENES_DIRECTORY}/{config.TEMPLATES_FNAME}"
+    with tracing.span("load_templates") as span, open(fname, "rb") as file:
+        data = file.read()
+        templates = template_cache.parse_json(data)
+        span.set(bytes=len(data), sources=len(templates.get("sources", [])))
     return templates
 
-def generate_scenes(url, scenelist_name):
+def load_template_catalog():
+    """
+    The TemplateCatalog for templates.json. With config.CACHE_TEMPLATES it comes from
+    template_cache, so an unchanged templates.json is parsed and indexed once per
+    process, and not at all while its pickled catalog is current.
+    """
+    if not config.CACHE_TEMPLATES:
+        return TemplateCatalog(load_templates())
+    return template_cache.load(f"{config.OBS_SCENES_DIRECTORY}/{config.TEMPLATES_FNAME}", TemplateCatalog)
+
+def _load_existing_scenes(scenelist_filename):
+    try:
+        with open(scenelist_filename, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Regenerating {scenelist_filename} from scratch; cannot read it: {e}")
+        return None
+
+@tracing.traced()
+def push_scenes(runlist_data, templates, scenelist_name, reporter=None):
+    """
+    Create or update the scenes for scenelist_name in a running OBS over obs-websocket,
+    so OBS doesn't have to be restarted to pick them up.
+    """
+    import obs_websocket # pylint: disable=import-outside-toplevel
+
+    pdf_url = f"file:///{config.PDF_SLIDES_DIRECTORY}Slides-{scenelist_name}.pdf#toolbar=0"
+    catalog = templates if isinstance(templates, TemplateCatalog) else TemplateCatalog(templates)
+    new_scenes = _generate_rows(runlist_data, lambda scene_spec: generate_scene(*scene_spec, catalog, pdf_url), reporter)
+
+    if reporter:
+        reporter.check()
+    with obs_websocket.ObsWebSocket() as client:
+        summary = obs_websocket.push_scenes(new_scenes, client)
+    print(f"{scenelist_name}: {summary}")
+
+def _write_if_changed(filename, text):
+    try:
+        with open(filename, "r", encoding="utf-8") as file:
+            if file.read() == text:
+                return
+    except FileNotFoundError:
+        pass
+    with atomic_file.open_replacing(filename) as file:
+        file.write(text)
+
+def _add_script(scenes, script_filename):
+    """Register an OBS script in the collection's scripts-tool module, if it isn't already."""
+    modules = dict(scenes.get("modules", {}))
+    scripts = list(modules.get("scripts-tool", []))
+    if not any(script.get("path") == script_filename for script in scripts):
+        scripts.append({"path": script_filename, "settings": {}})
+    modules["scripts-tool"] = scripts
+    scenes["modules"] = modules
+
+@tracing.traced()
+def render_slides(runlist_data, catalog, scenelist_name):
+    """
+    With config.SLIDE_RENDERING = "image", render the pages the runlist uses from the
+    downloaded slides and return {page: image filename}; otherwise return None.
+    """
+    if config.SLIDE_RENDERING != "image":
+        return None
+    import pdf_raster # pylint: disable=import-outside-toplevel
+
+    pdf_filename = f"{config.PDF_SLIDES_DIRECTORY}Slides-{scenelist_name}.pdf"
+    if not os.path.exists(pdf_filename):
+        print(f"No slides at {pdf_filename}; using browser sources")
+        return None
+    width, height = pdf_raster.canvas_size(catalog)
+    return pdf_raster.render_pages(pdf_filename, pdf_raster.referenced_pages(runlist_data), width, height)
+
+@tracing.traced()
+def write_scenes(runlist_data, templates, scenelist_name, reporter=None, incremental=None):
+    """
+    Generate the scene collection for scenelist_name and write it to the OBS scenes directory.
+
+    In incremental mode (config.INCREMENTAL_REGENERATION by default) an existing
+    collection is diffed against the runlist: unchanged scenes keep their objects and
+    UUIDs, changed ones are patched in place, and the file isn't rewritten at all if
+    nothing changed.
+
+    With config.OUTPUT_BACKEND = "websocket" the scenes are pushed into the running
+    OBS instead (see push_scenes) and no file is written.
+
+    With config.SLIDE_RENDERING = "image" the slides, which must already have been
+    downloaded, are shown as pre-rendered images rather than through browser sources.
+    """
+
+    if config.OUTPUT_BACKEND == "websocket":
+        push_scenes(runlist_data, templates, scenelist_name, reporter)
+        return
 
     obs_scenes_directory = config.OBS_SCENES_DIRECTORY
     pdf_slides_directory = config.PDF_SLIDES_DIRECTORY
-    templates_fname = config.TEMPLATES_FNAME
-
-    scenes_map = gs.get_sheet_urls(url, apikey.API_KEY)
-    runlist_url = scenes_map[scenelist_name]
-    runlist_data = gs.download_sheet(runlist_url)
 
     pdf_url = f"file:///{pdf_slides_directory}Slides-{scenelist_name}.pdf#toolbar=0"
 
-    fname = f"{obs_scenes_directory}/{templates_fname}"
-    with open(fname, "r", encoding="utf-8") as file:
-        templates = json.load(file)
+    scenelist_filename = f"{obs_scenes_directory}/{scenelist_name}.json"
+
+    if incremental is None:
+        incremental = config.INCREMENTAL_REGENERATION
+    existing = _load_existing_scenes(scenelist_filename) if incremental else None
+
+    catalog = templates if isinstance(templates, TemplateCatalog) else TemplateCatalog(templates)
+    shared_browser = None
+    if config.SHARED_BROWSER_TEMPLATES:
+        old_shared = None
+        if existing is not None:
+            old_shared = next((source for source in existing.get("sources", []) if source.get("name") == SharedBrowser.NAME), None)
+        shared_browser = SharedBrowser(catalog, pdf_url, config.SHARED_BROWSER_TEMPLATES,
+                                       old_shared.get("uuid") if old_shared else None)
 
-    scenes = _generate_scenes(runlist_data, templates, scenelist_name, pdf_url)
+    if config.SLIDE_RENDERING == "image" and not isinstance(runlist_data, list):
+        # The pages to render must be known before the first scene is generated
+        runlist_data = list(runlist_data)
+    page_images = render_slides(runlist_data, catalog, scenelist_name)
+
+    stats = RegenerationStats()
+    with tracing.span("_generate_scenes", incremental=existing is not None) as span:
+        scenes = _generate_scenes(runlist_data, catalog, scenelist_name, pdf_url, reporter, existing, stats, shared_browser, page_images)
+        span.set(rows=len(scenes["scene_order"]) - len(catalog.templates["scene_order"]))
+
+    if shared_browser is not None and shared_browser.pages:
+        print(f"{scenelist_name}: {shared_browser.report()}")
+        script_filename = os.path.abspath(f"{obs_scenes_directory}/{scenelist_name}-pages.lua")
+        _add_script(scenes, script_filename)
+        # The pages live in the script, not the collection, so it's written even when
+        # an incremental run leaves the collection alone
+        _write_if_changed(script_filename, shared_browser.script())
+
+    if existing is not None:
+        print(f"{scenelist_name}: {stats}")
+        if scenes == existing:
+            return
 
     # If OBS is running and the scenes file already exists,
     # OBS may already be aware of the file.
     # In that case, it is not safe to write it because OBS may just overwrite our changes.
 
-    scenelist_filename = f"{obs_scenes_directory}/{scenelist_name}.json"
     if os.path.exists(scenelist_filename) and process_util.obs_is_running():
         raise Exception("OBS is running, cannout write scenes file")
 
-    with open(scenelist_filename, "w", encoding="utf-8") as file:
-        json.dump(scenes, file, indent=4, ensure_ascii=False)
+    if reporter:
+        reporter.check()
+    with tracing.span("write_scene_collection", sources=len(scenes["sources"])) as span:
+        scene_writer.write_scene_collection(scenes, scenelist_filename, indent=config.SCENES_JSON_INDENT)
+        span.set(bytes=os.path.getsize(scenelist_filename))
+
+@tracing.run("generate_scenes")
+def generate_scenes(url, scenelist_name):
+    templates = load_template_catalog()
+    # The runlist is streamed, so scenes are generated while the rest of it downloads
+    runlist_rows = fetch_runlist(url, scenelist_name, stream=True)
+    write_scenes(runlist_rows, templates, scenelist_name)
+
+def load_pdf_map(url):
+    """The spreadsheet's first tab, which maps scenelist names to slide deck URLs."""
+    return dict(gs.download_sheet(url))
+
+@tracing.traced()
+def download_pdf(url, filename, reporter=None, pdf_map=None):
+    """
+    Download the slides for filename, if the spreadsheet's first tab maps it to a PDF.
 
-def download_pdf(url, filename):
+    Returns:
+    bool: the result of the download, or None if there are no slides for filename
+    """
     pdf_slides_directory = config.PDF_SLIDES_DIRECTORY
     pdf_filename = f"{pdf_slides_directory}Slides-{filename}.pdf"
 
-    pdf_url_data = gs.download_sheet(url)
-    pdf_map = dict(pdf_url_data)
+    if pdf_map is None:
+        pdf_map = load_pdf_map(url)
     if filename in pdf_map:
         pdf_url = pdf_map[filename]
-        gd.download_to_local_filesystem(pdf_url, pdf_filename)
+        return pdf_cache.fetch_pdf(pdf_url, pdf_filename, reporter=reporter)
+    return None
+
+@tracing.traced()
+def check_slides(runlist_data, scenelist_name, reporter=None, catalog=None):
+    """
+    Check the runlist's page numbers against the downloaded slides.
+
+    Pages used by more than one scene are reported as warnings; raises if any scene
+    uses a page the slides don't have. Does nothing if there are no slides. Given the
+    TemplateCatalog, only rows whose template has a browser item (the rows that show
+    a slide) are checked.
+    """
+    pdf_filename = f"{config.PDF_SLIDES_DIRECTORY}Slides-{scenelist_name}.pdf"
+    if not os.path.exists(pdf_filename):
+        return
+
+    uses_page = None if catalog is None else (lambda row: catalog.browser_item_index.get(row[1]) is not None)
+
+    errors, warnings = pdf_check.check_pages(runlist_data, pdf_check.page_count(pdf_filename), uses_page)
+    for warning in warnings:
+        print(f"{scenelist_name}: {warning}")
+        if reporter:
+            reporter.report("check", warning)
+    if errors:
+        raise Exception("; ".join(errors))
+
+class PipelineError(Exception):
+    """One or more stages of run_pipeline failed; errors holds (stage, exception) pairs."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(f"{stage}: {error}" for stage, error in errors))
+
+@tracing.run("run_pipeline")
+def run_pipeline(url, scenelist_name, reporter=None):
+    """
+    Generate the scenes for scenelist_name and download its slides concurrently.
+
+    The runlist fetch, the template load and the PDF download run on a small thread
+    pool. Once the slides are complete, the runlist's page numbers are checked
+    against them (which reads only the PDF's cross-reference data, so it costs
+    milliseconds), and the scenes are written only if they pass. Every
+    stage runs to completion even if another fails, and all failures are raised
+    together as a PipelineError.
+
+    If a progress.ProgressReporter is given, each stage reports to it and stops when
+    it is cancelled.
+    """
+    errors = []
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+        runlist_future = executor.submit(tracing.profiled(fetch_runlist), url, scenelist_name, reporter)
+        templates_future = executor.submit(tracing.profiled(load_template_catalog))
+        pdf_future = executor.submit(tracing.profiled(download_pdf), url, scenelist_name, reporter)
+
+        inputs = {}
+        for stage, future in (("runlist", runlist_future), ("templates", templates_future)):
+            try:
+                inputs[stage] = future.result()
+            except Exception as e:
+                errors.append((stage, e))
+
+        try:
+            downloaded = pdf_future.result()
+            if downloaded is False:
+                errors.append(("pdf", Exception(f"could not download the slides for {scenelist_name}")))
+        except Exception as e:
+            errors.append(("pdf", e))
+            downloaded = False
+
+        if "runlist" in inputs and downloaded:
+            try:
+                check_slides(inputs["runlist"], scenelist_name, reporter, inputs.get("templates"))
+            except Exception as e:
+                errors.append(("pages", e))
+
+        # A failed download leaves the previous slides in place, so the scenes are still written
+        if not any(stage != "pdf" for stage, _ in errors):
+            try:
+                write_scenes(inputs["runlist"], inputs["templates"], scenelist_name, reporter)
+            except Exception as e:
+                errors.append(("generate", e))
+
+    if errors:
+        raise PipelineError(errors)
+
+@tracing.run("run_batch")
+def run_batch(url, scenelist_names, max_workers=4, incremental=None):
+    """
+    Run the pipeline for several scenelists in one process.
+
+    The spreadsheet metadata and the templates are loaded once and shared, the PDF
+    map tab and the runlists are fetched together with gs.download_sheets, and the
+    scenelists are processed in parallel. Returns a dict mapping each
+    scenelist name to None on success or the exception it failed with.
+    """
+    results = {}
+
+    try:
+        sheet_urls = gs.get_sheet_urls(url, apikey.API_KEY, required=scenelist_names)
+        catalog = load_template_catalog()
+
+        # The PDF map tab and every runlist tab that exists come down in one request
+        map_gid = gs.extract_sheet_id_gid(url)[1]
+        map_tab = next((name for name, sheet_url in sheet_urls.items() if gs.extract_sheet_id_gid(sheet_url)[1] == map_gid), None)
+        tabs = [name for name in scenelist_names if name in sheet_urls]
+        sheets = gs.download_sheets(url, ([map_tab] if map_tab else []) + tabs, apikey.API_KEY)
+        pdf_map = dict(sheets[map_tab]) if map_tab else load_pdf_map(url)
+    except Exception as e:
+        return {scenelist_name: e for scenelist_name in scenelist_names}
+
+    @tracing.traced("run_one")
+    def run_one(scenelist_name):
+        errors = []
+        # The slides come first so they can be rendered when SLIDE_RENDERING is "image"
+        try:
+            downloaded = download_pdf(url, scenelist_name, pdf_map=pdf_map)
+            if downloaded is False:
+                errors.append(("pdf", Exception(f"could not download the slides for {scenelist_name}")))
+        except Exception as e:
+            errors.append(("pdf", e))
+            downloaded = False
+        try:
+            if scenelist_name not in sheets:
+                # The sheet map was already re-fetched once for the names it lacked
+                raise Exception(f"Cannot find sheet named '{scenelist_name}' in spreadsheet")
+            runlist_data = sheets[scenelist_name]
+            if downloaded:
+                check_slides(runlist_data, scenelist_name, catalog=catalog)
+            write_scenes(runlist_data, catalog, scenelist_name, incremental=incremental)
+        except Exception as e:
+            errors.append(("generate", e))
+        if errors:
+            raise PipelineError(errors)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {scenelist_name: executor.submit(tracing.profiled(run_one), scenelist_name) for scenelist_name in scenelist_names}
+        for scenelist_name, future in futures.items():
+            try:
+                future.result()
+                results[scenelist_name] = None
+            except Exception as e:
+                results[scenelist_name] = e
+
+    return results
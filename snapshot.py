@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+"""
+Take a local snapshot of the runlist spreadsheet and its slides, for generating scenes
+without Google.
+
+A snapshot directory holds the sheet map, every tab's rows and the slide decks the
+runlists use, described by manifest.json. Run this the evening before; then with
+config.OFFLINE = True (or scenegen.py --offline), google_sheets and google_drive answer
+everything from the snapshot and make no network requests at all.
+
+Example:
+    snapshot.py --url https://docs.google.com/spreadsheets/d/... --directory ./snapshot/
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+
+import atomic_file
+import config
+
+MANIFEST_FNAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+def _save_json_atomically(data, filename):
+    atomic_file.write_json(data, filename, ensure_ascii=False, indent=1)
+
+class Snapshot:
+    """A snapshot directory, read through its manifest."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        manifest_filename = os.path.join(directory, MANIFEST_FNAME)
+        try:
+            with open(manifest_filename, "r", encoding="utf-8") as file:
+                self.manifest = json.load(file)
+        except FileNotFoundError as e:
+            raise Exception(f"No offline snapshot at {directory} (take one with snapshot.py)") from e
+        if self.manifest.get("version") != MANIFEST_VERSION:
+            raise Exception(f"Unsupported snapshot version in {manifest_filename}")
+
+    @property
+    def created_at(self):
+        return self.manifest["created_at"]
+
+    def sheet_urls(self, spreadsheet_id):
+        if spreadsheet_id != self.manifest["spreadsheet_id"]:
+            raise Exception(f"The offline snapshot is of spreadsheet {self.manifest['spreadsheet_id']}, not {spreadsheet_id}")
+        return dict(self.manifest["sheet_urls"])
+
+    def sheet_rows(self, sheet_id, sheet_gid):
+        entry = self.manifest["sheets"].get(f"{sheet_id}-{sheet_gid}")
+        if entry is None:
+            raise Exception(f"Sheet {sheet_id} gid {sheet_gid} is not in the offline snapshot")
+        with open(os.path.join(self.directory, entry), "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def file_metadata(self, file_id):
+        return dict(self._file(file_id)["metadata"])
+
+    def file_path(self, file_id):
+        return os.path.join(self.directory, self._file(file_id)["filename"])
+
+    def _file(self, file_id):
+        entry = self.manifest["files"].get(file_id)
+        if entry is None:
+            raise Exception(f"Drive file {file_id} is not in the offline snapshot")
+        return entry
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+def current():
+    """The snapshot in config.SNAPSHOT_DIRECTORY, loaded once per process."""
+    global _snapshot # pylint: disable=global-statement
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.directory != config.SNAPSHOT_DIRECTORY:
+            _snapshot = Snapshot(config.SNAPSHOT_DIRECTORY)
+            print(f"Offline: using the snapshot taken {_snapshot.created_at}")
+        return _snapshot
+
+def take_snapshot(spreadsheet_url, directory=None, api_key=None):
+    """
+    Save the spreadsheet's sheet map, every tab, and the slides its PDF map lists for
+    those tabs to directory (default: config.SNAPSHOT_DIRECTORY).
+
+    Returns:
+        list: problems that didn't stop the snapshot, e.g. slides that couldn't be fetched
+    """
+    # pylint: disable=import-outside-toplevel
+    import google_drive as gd
+    import google_sheets as gs
+    import pdf_cache
+    if api_key is None:
+        from apikey import API_KEY as api_key
+
+    if config.OFFLINE:
+        raise Exception("Cannot take a snapshot in offline mode")
+    directory = directory or config.SNAPSHOT_DIRECTORY
+    spreadsheet_id = gs.extract_spreadsheet_id(spreadsheet_url)
+    problems = []
+
+    sheet_urls = gs.get_sheet_urls(spreadsheet_url, api_key, use_cache=False)
+    tabs = gs.download_sheets(spreadsheet_url, list(sheet_urls), api_key)
+    sheets = {}
+    for tab_name, rows in tabs.items():
+        _, sheet_gid = gs.extract_sheet_id_gid(sheet_urls[tab_name])
+        entry = os.path.join("sheets", f"{spreadsheet_id}-{sheet_gid}.json")
+        _save_json_atomically(rows, os.path.join(directory, entry))
+        sheets[f"{spreadsheet_id}-{sheet_gid}"] = entry
+    print(f"Saved {len(tabs)} tabs")
+
+    # The spreadsheet URL's own tab is the PDF map (see scenes.load_pdf_map)
+    _, map_gid = gs.extract_sheet_id_gid(spreadsheet_url)
+    map_rows = next((rows for tab_name, rows in tabs.items() if gs.extract_sheet_id_gid(sheet_urls[tab_name])[1] == map_gid), [])
+    pdf_map = {row[0]: row[1] for row in map_rows if len(row) > 1}
+
+    files = {}
+    for scenelist_name, pdf_url in pdf_map.items():
+        file_id = gd.extract_file_id(pdf_url)
+        if scenelist_name not in sheet_urls or file_id is None or file_id in files:
+            continue
+        try:
+            metadata = gd.get_file_metadata(file_id, api_key)
+        except Exception as e:
+            print(f"No metadata for the slides of {scenelist_name}: {e}")
+            metadata = {}
+        filename = os.path.join("pdfs", f"{file_id}.pdf")
+        os.makedirs(os.path.join(directory, "pdfs"), exist_ok=True)
+        if pdf_cache.fetch_pdf(pdf_url, os.path.join(directory, filename)):
+            files[file_id] = {"filename": filename, "metadata": metadata, "scenelist": scenelist_name}
+        else:
+            problems.append(f"could not download the slides for {scenelist_name}")
+    print(f"Saved {len(files)} slide decks")
+
+    _save_json_atomically({
+        "version": MANIFEST_VERSION,
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "spreadsheet_url": spreadsheet_url,
+        "spreadsheet_id": spreadsheet_id,
+        "sheet_urls": sheet_urls,
+        "sheets": sheets,
+        "files": files,
+    }, os.path.join(directory, MANIFEST_FNAME))
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Save the runlist spreadsheet and its slides for offline use.")
+    parser.add_argument("--url", default=config.SCENES_URL,
+                        help="spreadsheet URL (default: config.SCENES_URL)")
+    parser.add_argument("--directory", default=config.SNAPSHOT_DIRECTORY,
+                        help="where to save the snapshot (default: config.SNAPSHOT_DIRECTORY)")
+    args = parser.parse_args(argv)
+
+    started = time.monotonic()
+    problems = take_snapshot(args.url, args.directory)
+    for problem in problems:
+        print(f"WARNING: {problem}")
+    print(f"Snapshot saved to {args.directory} in {time.monotonic() - started:.1f}s")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+"""
+Measure how quickly the dialog starts.
+
+Records the import time of input_dialog (from -X importtime, in a fresh interpreter),
+the time from process launch to the dialog's first paint, and which heavy modules
+were already loaded when it painted. With --baseline, fails if first paint or import
+time regressed beyond --tolerance, or if a heavy module is loaded before first paint.
+
+Examples:
+    startup_benchmark.py --output startup.json
+    startup_benchmark.py --baseline startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that must not be loaded before the window is painted
+HEAVY_MODULES = ["requests", "urllib3", "psutil", "scenes", "google_sheets", "google_drive", "http_client"]
+
+PAINT_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import tkinter as tk
+import config
+import input_dialog
+import next_sunday
+root = tk.Tk()
+app = input_dialog.SimpleInputDialog(root, config.SCENES_URL, next_sunday.next_sunday_noon())
+root.update()
+painted = time.perf_counter()
+heavy = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+print(json.dumps({{"in_process_s": painted - start, "heavy_modules_at_paint": heavy}}), flush=True)
+root.destroy()
+"""
+
+def measure_import_time(runs):
+    """Cumulative import time of input_dialog in microseconds (best of runs), and its slowest imports."""
+    best = None
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import input_dialog"],
+                                cwd=HERE, capture_output=True, text=True, check=True)
+        modules = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            fields = line[len("import time:"):].split("|")
+            try:
+                self_us, cumulative_us = int(fields[0]), int(fields[1])
+            except ValueError:
+                continue  # the header line
+            modules.append((fields[2].strip(), self_us, cumulative_us))
+
+        total = next(cumulative for name, _, cumulative in modules if name == "input_dialog")
+        if best is None or total < best[0]:
+            best = (total, modules)
+
+    total, modules = best
+    slowest = sorted(modules, key=lambda module: module[1], reverse=True)[:10]
+    return {"input_dialog_import_us": total,
+            "slowest_imports": [{"module": name, "self_us": self_us, "cumulative_us": cumulative_us}
+                                for name, self_us, cumulative_us in slowest]}
+
+def measure_first_paint(runs):
+    """Seconds from launching a fresh interpreter to the dialog's first paint (best of runs)."""
+    best = None
+    for _ in range(runs):
+        launched = time.perf_counter()
+        with subprocess.Popen([sys.executable, "-c", PAINT_SCRIPT], cwd=HERE,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) as child:
+            line = child.stdout.readline()
+            painted = time.perf_counter()
+            _, stderr = child.communicate()
+        if not line:
+            raise Exception(f"Dialog did not start: {stderr.strip()}")
+        result = json.loads(line)
+        result["first_paint_s"] = painted - launched
+        if best is None or result["first_paint_s"] < best["first_paint_s"]:
+            best = result
+    return best
+
+def compare(results, baseline, tolerance):
+    problems = []
+    if results.get("heavy_modules_at_paint"):
+        problems.append(f"heavy modules loaded before first paint: {', '.join(results['heavy_modules_at_paint'])}")
+    for key in ("first_paint_s", "input_dialog_import_us"):
+        if key in results and key in baseline and results[key] > baseline[key] * (1 + tolerance):
+            problems.append(f"{key} regressed: {results[key]:.4g} vs baseline {baseline[key]:.4g}")
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure dialog import time and time to first paint.")
+    parser.add_argument("--runs", type=int, default=5, help="take the best of this many runs (default: 5)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results previously written with --output")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown relative to the baseline (default: 0.25)")
+    parser.add_argument("--no-paint", action="store_true", help="skip first paint, e.g. without a display")
+    args = parser.parse_args(argv)
+
+    results = measure_import_time(args.runs)
+    if not args.no_paint:
+        results.update(measure_first_paint(args.runs))
+
+    print(json.dumps(results, indent=4))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        problems = compare(results, baseline, args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        return 1 if problems else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+"""
+Cache of the parsed and indexed templates.json.
+
+templates.json almost never changes, but parsing it and indexing it (scenes.TemplateCatalog)
+is most of the fixed cost of a run. load() keeps the built catalog in memory, so batch runs
+and a long-running GUI pay for it once per process, and pickles it to
+CACHE_DIRECTORY/templates/, so the next process can skip the JSON entirely. Both are keyed
+by the file's path, size and modification time.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+import atomic_file
+import config
+import tracing
+
+# Bump when the pickled classes change shape, so old cache files are rebuilt
+FORMAT_VERSION = 1
+
+_memory = {}  # absolute path -> (key, value)
+_memory_lock = threading.Lock()
+
+def parse_json(data):
+    """Parse JSON text or bytes, with orjson when it's installed."""
+    try:
+        import orjson # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return json.loads(data)
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # orjson is stricter (no NaN, no integers beyond 64 bits); let json decide
+        return json.loads(data)
+
+def _cache_filename(path):
+    digest = hashlib.sha1(path.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(config.CACHE_DIRECTORY, "templates", f"{os.path.basename(path)}-{digest}.pickle")
+
+def _load_pickle(path, key):
+    try:
+        with open(_cache_filename(path), "rb") as file:
+            cached_key, value = pickle.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable template cache for {path}: {e}")
+        return None
+    return value if cached_key == key else None
+
+def _save_pickle(path, key, value):
+    filename = _cache_filename(path)
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with atomic_file.open_replacing(filename, "wb") as file:
+            pickle.dump((key, value), file, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        print(f"Could not cache the templates from {path}: {e}")
+
+def load(filename, build):
+    """
+    build(parsed JSON) for the JSON file at filename, from memory or the pickle cache
+    when the file hasn't changed since it was last built. The value is shared by
+    everyone who loads the same file, so build's result must be treated as read-only.
+    """
+    path = os.path.abspath(filename)
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns, FORMAT_VERSION)
+
+    with _memory_lock:
+        entry = _memory.get(path)
+    if entry is not None and entry[0] == key:
+        return entry[1]
+
+    with tracing.span("template_cache.load", bytes=stat.st_size) as span:
+        value = _load_pickle(path, key)
+        span.set(source="pickle")
+        if value is None:
+            with open(path, "rb") as file:
+                value = build(parse_json(file.read()))
+            _save_pickle(path, key, value)
+            span.set(source="json")
+
+    with _memory_lock:
+        _memory[path] = (key, value)
+    return value
+
+def invalidate(filename=None):
+    """Forget the in-memory copy of filename (all files if None); the pickles are checked on load anyway."""
+    with _memory_lock:
+        if filename is None:
+            _memory.clear()
+        else:
+            _memory.pop(os.path.abspath(filename), None)
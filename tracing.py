@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+# pylint: disable=broad-exception-caught
+# pylint: disable=broad-exception-raised
+# pylint: disable=line-too-long
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=too-many-instance-attributes
+
+"""
+Timing spans for generation runs, written as Chrome trace JSON (open it in Perfetto,
+https://ui.perfetto.dev, or chrome://tracing).
+
+Set config.TRACE_DIRECTORY to record a trace of every run (run_pipeline, run_batch,
+generate_scenes, ...) to <directory>/<run>-<timestamp>.trace.json, and also set
+config.PROFILE_RUNS to write a cProfile dump of the run next to it (.prof; read it with
+python -m pstats or snakeviz).
+
+Instrumented code uses
+
+    with tracing.span("download_sheet", gid=gid) as span:
+        ...
+        span.set(bytes=len(content), rows=len(rows))
+
+or the @tracing.traced() decorator. When no run is being recorded, span() returns a
+shared do-nothing object, so instrumentation costs one global lookup.
+"""
+
+import contextlib
+import functools
+import json
+import os
+import re
+import threading
+import time
+
+import config
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **args):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+class Span:
+    __slots__ = ("recording", "name", "args", "start")
+
+    def __init__(self, recording, name, args):
+        self.recording = recording
+        self.name = name
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, _traceback):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = f"{exc_type.__name__}: {exc}"
+        self.recording.add(self.name, self.start, end, self.args)
+        return False
+
+    def set(self, **args):
+        """Attach values (bytes, rows, ...) to the span; they show up as its args."""
+        self.args.update(args)
+
+class Recording:
+    """The spans, and optionally the profiles, of one run."""
+
+    def __init__(self, name, profile=False):
+        self.name = name
+        self.events = []
+        self.thread_names = {}
+        self.profiles = [] if profile else None
+        self._profile = None
+        self._origin = time.perf_counter_ns()
+
+    def add(self, name, start, end, args):
+        thread = threading.current_thread()
+        self.thread_names.setdefault(thread.ident, thread.name)
+        # list.append is atomic, so spans from pool threads need no lock
+        self.events.append({"name": name, "ph": "X", "pid": os.getpid(), "tid": thread.ident,
+                            "ts": (start - self._origin) / 1000, "dur": (end - start) / 1000, "args": args})
+
+    def start_profile(self):
+        if self.profiles is not None:
+            import cProfile # pylint: disable=import-outside-toplevel
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop_profile(self):
+        if self._profile is not None:
+            self._profile.disable()
+            self.profiles.append(self._profile)
+            self._profile = None
+
+    def trace(self):
+        metadata = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                    for tid, name in self.thread_names.items()]
+        return {"traceEvents": metadata + sorted(self.events, key=lambda event: event["ts"]),
+                "displayTimeUnit": "ms"}
+
+    def write(self, directory):
+        """Write the trace (and profile) to directory; returns the trace filename."""
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', self.name)}-{time.strftime('%Y%m%d-%H%M%S')}")
+        with open(f"{stem}.trace.json", "w", encoding="utf-8") as file:
+            json.dump(self.trace(), file, default=str)
+        if self.profiles:
+            import pstats # pylint: disable=import-outside-toplevel
+            stats = pstats.Stats(self.profiles[0])
+            for profile in self.profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(f"{stem}.prof")
+        return f"{stem}.trace.json"
+
+# The run being recorded, shared by all threads
+_recording = None
+_recording_lock = threading.Lock()
+
+def span(name, **args):
+    recording = _recording
+    if recording is None:
+        return NULL_SPAN
+    return Span(recording, name, args)
+
+def traced(name=None):
+    """Decorator recording each call of the function as a span (named after it by default)."""
+    def decorator(function):
+        label = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            recording = _recording
+            if recording is None:
+                return function(*args, **kwargs)
+            with Span(recording, label, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def profiled(function):
+    """
+    Wrap a function that will run on another thread (e.g. one submitted to an
+    executor) so it is included in the run's profile. A no-op unless profiling.
+    """
+    recording = _recording
+    if recording is None or recording.profiles is None:
+        return function
+
+    import cProfile # pylint: disable=import-outside-toplevel
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one profiler at a time, and it already sees every thread
+            return function(*args, **kwargs)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+            recording.profiles.append(profile)
+    return wrapper
+
+@contextlib.contextmanager
+def run(name):
+    """
+    Record everything inside as one run, if config.TRACE_DIRECTORY is set. Nested
+    runs (e.g. generate_scenes called from a batch) become spans of the outer one.
+    Also works as a decorator, recording each call as a run.
+    """
+    global _recording # pylint: disable=global-statement
+    with _recording_lock:
+        recording = None
+        if _recording is None and config.TRACE_DIRECTORY:
+            recording = _recording = Recording(name, profile=config.PROFILE_RUNS)
+    if recording is None:
+        with span(name):
+            yield
+        return
+
+    recording.start_profile()
+    try:
+        with Span(recording, name, {}):
+            yield
+    finally:
+        recording.stop_profile()
+        with _recording_lock:
+            _recording = None
+        try:
+            print(f"Trace written to {recording.write(config.TRACE_DIRECTORY)}")
+        except Exception as e:
+            print(f"Could not write the trace of {name}: {e}")
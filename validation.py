@@ -1,19 +1,26 @@
 
 import os
 
-import apikey
 import config
-import google_sheets as gs
+import tracing
 
+@tracing.traced()
 def can_get_sheetmap(url, filename):
+    # Imported here so the dialog can validate its config without loading requests
+    # pylint: disable=import-outside-toplevel
+    import apikey
+    import google_sheets as gs
+
     try:
-        sheetmap = gs.get_sheet_urls(url, apikey.API_KEY)
+        # The tab may have been added since the sheet map was cached
+        sheetmap = gs.get_sheet_urls(url, apikey.API_KEY, required=[filename])
     except Exception as e:
         return Exception(f"Cannot access sheet information for spreadsheet: {e}")
 
     if filename not in sheetmap:
         return Exception(f"Cannot find sheet named '{filename}' in spreadsheet")
 
+@tracing.traced()
 def validate_config():
     def missing_path(msg, fname):
         return Exception(f"{msg}: {fname}")
@@ -26,3 +33,7 @@ def validate_config():
 
     if not os.path.isfile(f"{config.OBS_SCENES_DIRECTORY}{config.TEMPLATES_FNAME}"):
         return missing_path("missing scene templates file", config.TEMPLATES_FNAME)
+
+    snapshot_manifest = os.path.join(config.SNAPSHOT_DIRECTORY, "manifest.json")
+    if config.OFFLINE and not os.path.isfile(snapshot_manifest):
+        return missing_path("offline mode but no snapshot", config.SNAPSHOT_DIRECTORY)